@@ -1,9 +1,13 @@
 import asyncio
+import json
 import logging
 import re
+import time
 import markdown
+from collections import OrderedDict, deque
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Awaitable, Callable, Optional, Tuple
 
 from nio import (
     AsyncClient,
@@ -17,12 +21,50 @@ from nio import (
 )
 
 from .config import Config
-from .discourse import DiscourseSearcher
+from .discourse import DiscourseSearchCache, DiscourseSearcher
 from .llm import LLMClient
 from .responses import ResponseConfig
 
 logger = logging.getLogger(__name__)
 
+def _normalize_whitespace(text: str) -> str:
+    """Collapse whitespace runs to single spaces and trim the ends."""
+    # str.split() drops leading/trailing whitespace and splits on any run of it
+    return ' '.join(text.split())
+
+
+@lru_cache(maxsize=8)
+def _compile_mention_pattern(bot_mentions: Tuple[str, ...]) -> re.Pattern:
+    """Combine the removal patterns for all bot mentions into one case-insensitive regex."""
+    alternatives = []
+    for mention in bot_mentions:
+        if mention.startswith('@'):
+            # For @mentions, remove the whole word
+            alternatives.append(rf"@{re.escape(mention[1:])}\b")
+        # Also handle the mention without @ in case it's in the list
+        alternatives.append(rf"\b{re.escape(mention)}\b")
+    # A ':' or ',' directly after a mention ("@askaosus: how ...") goes with it
+    return re.compile(f"(?:{'|'.join(alternatives)})[:,]?", re.IGNORECASE)
+
+
+def _remove_mentions(text: str, bot_mentions: Tuple[str, ...]) -> str:
+    """Remove all bot mentions from text with the cached combined pattern."""
+    return _compile_mention_pattern(bot_mentions).sub("", text)
+
+
+# Number of fetched Matrix events kept for reuse by reply and thread lookups
+_EVENT_CACHE_SIZE = 512
+
+# Matrix fallback quote lines: "> text", possibly indented (a bare ">" line is kept)
+_QUOTE_LINE_RE = re.compile(r'^[^\S\n]*> [^\n]*\S[^\n]*$', re.MULTILINE)
+
+
+def _in_reply_to_event_id(event) -> Optional[str]:
+    """Return the ID of the event this event replies to, or None if it is not a reply."""
+    # Every matrix-nio event carries its raw payload in .source
+    relates_to = event.source.get('content', {}).get('m.relates_to') or {}
+    return (relates_to.get('m.in_reply_to') or {}).get('event_id')
+
 
 def _convert_markdown_to_html(text: str) -> str:
     """
@@ -94,9 +136,16 @@ class AskaosusBot:
         # Track bot messages for reply behavior (store event IDs of messages sent by bot)
         self.bot_message_ids = set()
         
+        # Recently fetched events, most recently used last (see _get_room_event)
+        self._event_cache = OrderedDict()
+        
+        # Mentions never change at runtime; a tuple can key the cached mention patterns directly
+        self._bot_mentions = tuple(config.bot_mentions)
+        
         # Initialize other components
-        self.discourse_searcher = DiscourseSearcher(config)
-        self.llm_client = LLMClient(config, self.discourse_searcher)
+        self.discourse_searcher = DiscourseSearcher(config, self.response_config)
+        search_cache = DiscourseSearchCache(config.bot_search_cache_ttl) if config.bot_search_cache_ttl > 0 else None
+        self.llm_client = LLMClient(config, self.discourse_searcher, search_cache, self.response_config)
         
         # Rate limiting
         self.last_message_time = 0.0
@@ -111,7 +160,6 @@ class AskaosusBot:
             self.is_running = True
             
             # Record the start time to ignore old messages
-            import time
             self.start_time = int(time.time() * 1000)  # Convert to milliseconds
             
             # Ensure store directory exists
@@ -163,7 +211,6 @@ class AskaosusBot:
         # Attempt to restore session from JSON file inside matrix_store
         if session_file.exists():
             try:
-                import json
                 data = json.loads(session_file.read_text(encoding="utf-8"))
                 self.matrix_client.user_id = data.get("user_id")
                 self.matrix_client.access_token = data.get("access_token")
@@ -189,7 +236,6 @@ class AskaosusBot:
             logger.info(f"Logged in as {self.config.matrix_user_id}")
             # Save session credentials to JSON for future restores
             try:
-                import json
                 session_file.write_text(
                     json.dumps({
                         "user_id": self.matrix_client.user_id,
@@ -221,8 +267,9 @@ class AskaosusBot:
             return
         
         # Skip old messages (messages sent before bot started)
-        if self.start_time and hasattr(event, 'server_timestamp') and event.server_timestamp:
-            if event.server_timestamp < self.start_time:
+        server_timestamp = getattr(event, 'server_timestamp', None)
+        if self.start_time and server_timestamp:
+            if server_timestamp < self.start_time:
                 logger.debug(f"Skipping old message from {event.sender}: {event.body[:50]}...")
                 return
         
@@ -247,39 +294,13 @@ class AskaosusBot:
                 await self.matrix_client.room_typing(room.room_id, True)
                 
                 try:
-                    # Process the question
-                    answer = await self._process_question(question)
-                    
-                    # Convert markdown to HTML for formatted_body
-                    formatted_answer = _convert_markdown_to_html(answer)
-                    
-                    # Prepare message content
-                    content = {
-                        "msgtype": "m.text",
-                        "body": answer,  # Plain text version
-                        "format": "org.matrix.custom.html",
-                        "formatted_body": formatted_answer,  # HTML version
-                    }
-                    
-                    # Add reply information if this is a response to a reply
-                    if reply_to_event_id:
-                        content["m.relates_to"] = {
-                            "m.in_reply_to": {
-                                "event_id": reply_to_event_id
-                            }
-                        }
-                    
-                    # Send the answer
-                    response = await self.matrix_client.room_send(
-                        room_id=room.room_id,
-                        message_type="m.room.message",
-                        content=content,
-                    )
-                    
-                    # Track this bot message for reply behavior
-                    if hasattr(response, 'event_id') and response.event_id:
-                        self.bot_message_ids.add(response.event_id)
-                        logger.debug(f"Tracking bot message: {response.event_id}")
+                    if self.config.bot_stream_responses:
+                        # Send the answer early and edit it in place as it streams
+                        await self._process_question_streaming(room, question, reply_to_event_id)
+                    else:
+                        # Process the question
+                        answer = await self._process_question(question)
+                        await self._send_answer(room, answer, reply_to_event_id)
                     
                     logger.info(f"Sent answer in room {room.room_id}")
                     
@@ -295,6 +316,126 @@ class AskaosusBot:
             except:
                 pass
     
+    def _build_message_content(self, answer: str) -> dict:
+        """Build Matrix message content with plain text and HTML versions of an answer."""
+        return {
+            "msgtype": "m.text",
+            "body": answer,  # Plain text version
+            "format": "org.matrix.custom.html",
+            "formatted_body": _convert_markdown_to_html(answer),  # HTML version
+        }
+    
+    async def _send_answer(self, room: MatrixRoom, answer: str, reply_to_event_id: Optional[str]) -> Optional[str]:
+        """
+        Send an answer to a room.
+        
+        Returns:
+            The event ID of the sent message, or None if it could not be determined
+        """
+        content = self._build_message_content(answer)
+        
+        # Add reply information if this is a response to a reply
+        if reply_to_event_id:
+            content["m.relates_to"] = {
+                "m.in_reply_to": {
+                    "event_id": reply_to_event_id
+                }
+            }
+        
+        # Send the answer
+        response = await self.matrix_client.room_send(
+            room_id=room.room_id,
+            message_type="m.room.message",
+            content=content,
+        )
+        
+        # Track this bot message for reply behavior
+        event_id = getattr(response, 'event_id', None)
+        if event_id:
+            self.bot_message_ids.add(event_id)
+            logger.debug(f"Tracking bot message: {event_id}")
+        
+        return event_id
+    
+    async def _edit_answer(self, room: MatrixRoom, event_id: str, answer: str):
+        """Replace the content of a previously sent answer using a Matrix edit (m.replace)."""
+        new_content = self._build_message_content(answer)
+        content = {
+            "msgtype": "m.text",
+            "body": f"* {new_content['body']}",
+            "format": "org.matrix.custom.html",
+            "formatted_body": f"* {new_content['formatted_body']}",
+            "m.new_content": new_content,
+            "m.relates_to": {
+                "rel_type": "m.replace",
+                "event_id": event_id,
+            },
+        }
+        
+        await self.matrix_client.room_send(
+            room_id=room.room_id,
+            message_type="m.room.message",
+            content=content,
+        )
+    
+    async def _process_question_streaming(self, room: MatrixRoom, question: str, reply_to_event_id: Optional[str]):
+        """
+        Process a question and stream the answer into a single message.
+        
+        The first chunk of the answer is sent as a new message, which is then
+        edited in place as more text arrives; the LLM client forwards partial
+        text at most once per BOT_STREAM_EDIT_INTERVAL_SECONDS. The final answer
+        always replaces the partial text.
+        """
+        event_id = None
+        sent_text = None
+        streaming_stopped = False
+        
+        async def on_partial(text: str):
+            nonlocal event_id, sent_text, streaming_stopped
+            if streaming_stopped:
+                return
+            
+            try:
+                if event_id is None:
+                    event_id = await self._send_answer(room, text, reply_to_event_id)
+                    if event_id is None:
+                        # Without an event to edit, fall back to a single final message
+                        streaming_stopped = True
+                        return
+                else:
+                    await self._edit_answer(room, event_id, text)
+                sent_text = text
+            except Exception as e:
+                logger.warning(f"Failed to stream partial answer: {e}")
+                streaming_stopped = True
+        
+        answer = await self._process_question(question, on_partial=on_partial)
+        
+        if event_id is None:
+            await self._send_answer(room, answer, reply_to_event_id)
+        elif answer != sent_text:
+            await self._edit_answer(room, event_id, answer)
+    
+    async def _get_room_event(self, room: MatrixRoom, event_id: str):
+        """
+        Fetch a room event, reusing recently fetched ones.
+        
+        Replies in the same thread walk the same ancestors, and sent events do not
+        change, so successful responses are kept in a small LRU cache.
+        """
+        response = self._event_cache.get(event_id)
+        if response is not None:
+            self._event_cache.move_to_end(event_id)
+            return response
+        
+        response = await self.matrix_client.room_get_event(room.room_id, event_id)
+        if isinstance(response, RoomGetEventResponse):
+            self._event_cache[event_id] = response
+            if len(self._event_cache) > _EVENT_CACHE_SIZE:
+                self._event_cache.popitem(last=False)
+        return response
+    
     async def _get_thread_context(self, room: MatrixRoom, event_id: str, max_depth: int = 6) -> list:
         """
         Traverse a reply thread up to a specified depth and collect message context.
@@ -307,14 +448,22 @@ class AskaosusBot:
         Returns:
             List of message contents in chronological order (oldest first)
         """
-        thread_messages = []
+        # Walking up the thread visits newest messages first, so prepend each one
+        # to keep the result in chronological order
+        thread_messages = deque()
+        visited = set()
         current_event_id = event_id
         depth = 0
         
         while current_event_id and depth < max_depth:
+            if current_event_id in visited:
+                logger.warning(f"Reply chain loops back to {current_event_id}, stopping thread traversal")
+                break
+            visited.add(current_event_id)
+            
             try:
                 logger.debug(f"Fetching thread message {depth + 1}/{max_depth}: {current_event_id}")
-                response = await self.matrix_client.room_get_event(room.room_id, current_event_id)
+                response = await self._get_room_event(room, current_event_id)
                 
                 if not isinstance(response, RoomGetEventResponse):
                     logger.warning(f"Failed to fetch thread message {current_event_id}: {response}")
@@ -329,8 +478,8 @@ class AskaosusBot:
                     event_type = type(event).__name__
                     content = f"[{event_type} - content not accessible as text]"
                 
-                # Add to thread messages (we'll reverse later for chronological order)
-                thread_messages.append({
+                # Add to thread messages (oldest first)
+                thread_messages.appendleft({
                     'content': content,
                     'event_id': current_event_id,
                     'sender': getattr(event, 'sender', 'unknown'),
@@ -340,23 +489,37 @@ class AskaosusBot:
                 depth += 1
                 
                 # Check if this message is also a reply
-                next_event_id = None
-                if hasattr(event, 'source') and 'content' in event.source:
-                    content_data = event.source['content']
-                    if 'm.relates_to' in content_data and 'm.in_reply_to' in content_data['m.relates_to']:
-                        next_event_id = content_data['m.relates_to']['m.in_reply_to']['event_id']
-                
-                current_event_id = next_event_id
+                current_event_id = _in_reply_to_event_id(event)
                 
             except Exception as e:
                 logger.warning(f"Error fetching thread message {current_event_id}: {e}")
                 break
         
-        # Reverse to get chronological order (oldest first)
-        thread_messages.reverse()
-        
         logger.debug(f"Collected {len(thread_messages)} messages in thread")
-        return thread_messages
+        return list(thread_messages)
+    
+    async def _fetch_replied_to_content(self, room: MatrixRoom, event_id: str) -> str:
+        """Fetch the body of a replied-to message, or a placeholder if it is unavailable."""
+        try:
+            logger.debug(f"Fetching replied-to message: {event_id}")
+            original_response = await self._get_room_event(room, event_id)
+            
+            if isinstance(original_response, RoomGetEventResponse):
+                original_event = original_response.event
+                if isinstance(original_event, RoomMessageText):
+                    replied_to_content = original_event.body
+                    logger.debug(f"Retrieved replied-to message content: {replied_to_content[:100]}...")
+                    return replied_to_content
+                
+                event_type = type(original_event).__name__
+                logger.debug(f"Original event is not a text message: {event_type}")
+                return f"[{event_type} - content not accessible as text]"
+            
+            logger.warning(f"Failed to fetch original message {event_id}: {original_response}")
+        except Exception as e:
+            logger.warning(f"Error fetching replied-to message: {e}")
+        
+        return "[Original message could not be retrieved]"
     
     async def _should_respond(self, room: MatrixRoom, event: RoomMessageText) -> Tuple[Optional[str], bool, Optional[str]]:
         """
@@ -365,48 +528,25 @@ class AskaosusBot:
         Returns:
             Tuple of (question_with_context, should_respond, reply_to_event_id)
         """
+        bot_mentions = self._bot_mentions
+        
+        # Check if the message mentions the bot (surrounding whitespace can't be part of a mention)
+        mentioned = self.config.bot_mentions_re.search(event.body) is not None
+        
+        # Check if this is a reply to another message. The replied-to message is
+        # only fetched once we know the bot is going to respond
+        original_event_id = _in_reply_to_event_id(event)
+        is_reply = original_event_id is not None
+        
+        # Check if this is a reply to a bot message
+        is_reply_to_bot = is_reply and original_event_id in self.bot_message_ids
+        
+        # Most messages neither mention the bot nor reply to it; skip them before any
+        # further work
+        if not mentioned and not is_reply_to_bot:
+            return None, False, None
+        
         message_body = event.body.strip()
-        bot_mentions = self.config.bot_mentions
-        
-        # Check if the message mentions the bot
-        message_lower = message_body.lower()
-        mentioned = any(mention.lower() in message_lower for mention in bot_mentions)
-        
-        # Check if this is a reply to another message
-        is_reply = False
-        original_event_id = None
-        replied_to_content = None
-        is_reply_to_bot = False
-        
-        if hasattr(event, 'source') and 'content' in event.source:
-            content = event.source['content']
-            if 'm.relates_to' in content and 'm.in_reply_to' in content['m.relates_to']:
-                is_reply = True
-                original_event_id = content['m.relates_to']['m.in_reply_to']['event_id']
-                
-                # Check if this is a reply to a bot message
-                is_reply_to_bot = original_event_id in self.bot_message_ids
-                
-                # Fetch the original message for context
-                try:
-                    logger.debug(f"Fetching replied-to message: {original_event_id}")
-                    original_response = await self.matrix_client.room_get_event(room.room_id, original_event_id)
-                    
-                    if isinstance(original_response, RoomGetEventResponse):
-                        original_event = original_response.event
-                        if isinstance(original_event, RoomMessageText):
-                            replied_to_content = original_event.body
-                            logger.debug(f"Retrieved replied-to message content: {replied_to_content[:100]}...")
-                        else:
-                            event_type = type(original_event).__name__
-                            replied_to_content = f"[{event_type} - content not accessible as text]"
-                            logger.debug(f"Original event is not a text message: {event_type}")
-                    else:
-                        logger.warning(f"Failed to fetch original message {original_event_id}: {original_response}")
-                        replied_to_content = "[Original message could not be retrieved]"
-                except Exception as e:
-                    logger.warning(f"Error fetching replied-to message: {e}")
-                    replied_to_content = "[Original message could not be retrieved]"
         
         # Handle different reply behaviors
         reply_behavior = self.config.bot_reply_behavior
@@ -444,10 +584,10 @@ class AskaosusBot:
                     
                     if thread_messages:
                         # Format thread context with chronological messages
-                        context_parts = []
-                        for i, msg in enumerate(thread_messages):
-                            sender_label = "Bot" if msg['is_bot_message'] else "User"
-                            context_parts.append(f"Message {i+1} ({sender_label}): {msg['content']}")
+                        context_parts = [
+                            f"Message {i} ({'Bot' if msg['is_bot_message'] else 'User'}): {msg['content']}"
+                            for i, msg in enumerate(thread_messages, 1)
+                        ]
                         
                         # Add the current reply at the end
                         context_parts.append(f"Current reply: {cleaned_body}")
@@ -456,22 +596,19 @@ class AskaosusBot:
                         logger.info(f"Processing reply with {len(thread_messages)} thread messages as context")
                     else:
                         # Fallback to single message context if thread collection failed
-                        if replied_to_content is None:
-                            replied_to_content = "[Original message could not be retrieved]"
+                        replied_to_content = await self._fetch_replied_to_content(room, original_event_id)
                         full_context = f"Original message: {replied_to_content}\n\nReply: {cleaned_body}"
                         logger.info("Using fallback single message context")
                         
                 except Exception as e:
                     logger.warning(f"Failed to collect thread context: {e}")
                     # Fallback to single message context
-                    if replied_to_content is None:
-                        replied_to_content = "[Original message could not be retrieved]"
+                    replied_to_content = await self._fetch_replied_to_content(room, original_event_id)
                     full_context = f"Original message: {replied_to_content}\n\nReply: {cleaned_body}"
                     logger.info("Using fallback single message context due to thread collection error")
             else:
                 # For mention mode, use single message context (original behavior)
-                if replied_to_content is None:
-                    replied_to_content = "[Original message could not be retrieved]"
+                replied_to_content = await self._fetch_replied_to_content(room, original_event_id)
                 full_context = f"Original message: {replied_to_content}\n\nReply: {cleaned_body}"
                 logger.info("Processing reply to bot message with single message context")
             
@@ -482,14 +619,10 @@ class AskaosusBot:
             # For replies to non-bot messages, only respond if mentioned (original behavior)
             if mentioned:
                 logger.debug("Processing reply to non-bot message with mention")
-                question = message_body
-                for mention in bot_mentions:
-                    question = re.sub(rf"\b{re.escape(mention)}\b", "", question, flags=re.IGNORECASE)
-                question = question.strip()
+                question = _remove_mentions(message_body, bot_mentions).strip()
                 
                 # Provide context with original message
-                if replied_to_content is None:
-                    replied_to_content = "[Original message could not be retrieved]"
+                replied_to_content = await self._fetch_replied_to_content(room, original_event_id)
                 
                 full_context = f"Original message: {replied_to_content}\n\nReply: {question}"
                 logger.info("Processing reply to non-bot message with mention and context")
@@ -501,10 +634,7 @@ class AskaosusBot:
         # Case 3: This is a direct message (not a reply)
         elif mentioned:
             # Remove the mention from the message to get the question
-            question = message_body
-            for mention in bot_mentions:
-                question = re.sub(rf"\b{re.escape(mention)}\b", "", question, flags=re.IGNORECASE)
-            question = question.strip()
+            question = _remove_mentions(message_body, bot_mentions).strip()
             
             if question:
                 logger.debug("Processing direct mention")
@@ -524,39 +654,32 @@ class AskaosusBot:
         Returns:
             Cleaned message content
         """
-        cleaned = message_body
-        
-        # Remove bot mentions - handle @ symbols properly
-        for mention in bot_mentions:
-            if mention.startswith('@'):
-                # For @mentions, remove the whole word
-                cleaned = re.sub(rf"@{re.escape(mention[1:])}\b", "", cleaned, flags=re.IGNORECASE)
-            # Also handle the mention without @ in case it's in the list
-            cleaned = re.sub(rf"\b{re.escape(mention)}\b", "", cleaned, flags=re.IGNORECASE)
+        # Remove bot mentions in a single pass - handles @ symbols properly
+        cleaned = _remove_mentions(message_body, tuple(bot_mentions))
         
         # Remove common Matrix reply prefixes (fallback formatting)
-        # This removes lines that start with "> " which are quote replies
-        lines = cleaned.split('\n')
-        non_quote_lines = []
-        for line in lines:
-            # Skip lines that are Matrix quote replies
-            if not line.strip().startswith('> '):
-                non_quote_lines.append(line)
-        
-        cleaned = '\n'.join(non_quote_lines).strip()
+        # This removes lines that start with "> " which are quote replies; the
+        # newlines left behind are collapsed with the rest of the whitespace below.
+        # Most messages have no quotes at all, so skip the regex for them
+        if '> ' in cleaned:
+            cleaned = _QUOTE_LINE_RE.sub('', cleaned)
         
         # Remove extra whitespace
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+        cleaned = _normalize_whitespace(cleaned)
         
         return cleaned
     
-    async def _process_question(self, question: str) -> str:
+    async def _process_question(
+        self,
+        question: str,
+        on_partial: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> str:
         """Process a question using the new LLM tool-calling approach."""
         try:
             logger.info(f"Processing question: {question}")
             
             # Use the new tool-calling approach
-            answer = await self.llm_client.process_question_with_tools(question)
+            answer = await self.llm_client.process_question_with_tools(question, on_partial=on_partial)
             
             logger.info("Successfully processed question with tools")
             return answer
@@ -1,7 +1,11 @@
+import logging
 import os
+import re
 from typing import Optional
 from urllib.parse import urlparse, urlencode, parse_qs, urlunparse
 
+logger = logging.getLogger(__name__)
+
 
 class Config:
     """Configuration class for the Askaosus Matrix Bot."""
@@ -38,9 +42,13 @@ class Config:
         # Bot mentions (comma-separated list)
         bot_mentions_str = os.getenv("BOT_MENTIONS", "@askaosus,askaosus")
         self.bot_mentions = [mention.strip() for mention in bot_mentions_str.split(",")]
+        # Single case-insensitive pattern matching any configured mention
+        self.bot_mentions_re = re.compile("|".join(map(re.escape, self.bot_mentions)), re.IGNORECASE)
         self.bot_rate_limit_seconds = float(os.getenv("BOT_RATE_LIMIT_SECONDS", "1.0"))
         self.bot_max_search_results = int(os.getenv("BOT_MAX_SEARCH_RESULTS", "5"))
         self.bot_max_search_iterations = int(os.getenv("BOT_MAX_SEARCH_ITERATIONS", "3"))
+        # Seconds to reuse results for repeated search queries (0 disables the cache)
+        self.bot_search_cache_ttl = float(os.getenv("BOT_SEARCH_CACHE_TTL_SECONDS", "900"))
         self.bot_debug = os.getenv("BOT_DEBUG", "false").lower() == "true"
         
         # Reply behavior configuration
@@ -49,9 +57,22 @@ class Config:
         # Thread depth configuration (only applies in watch mode)
         self.bot_thread_depth_limit = int(os.getenv("BOT_THREAD_DEPTH_LIMIT", "6"))
         
+        # Streaming configuration (send the answer early and edit it as tokens arrive)
+        self.bot_stream_responses = os.getenv("BOT_STREAM_RESPONSES", "false").lower() == "true"
+        self.bot_stream_edit_interval = float(os.getenv("BOT_STREAM_EDIT_INTERVAL_SECONDS", "2.0"))
+        
         # UTM tracking configuration
         self.utm_tags = os.getenv("BOT_UTM_TAGS", "")
         
+        # Parse UTM tags once; they are static for the lifetime of the config
+        # Expected format: "utm_source=bot&utm_medium=matrix&utm_campaign=help"
+        self._utm_params = {}
+        for param in self.utm_tags.split('&'):
+            if '=' in param:
+                key, value = param.split('=', 1)
+                self._utm_params[key] = [value]
+        self._utm_query = urlencode(self._utm_params, doseq=True)
+        
         # Logging configuration
         self.log_level = os.getenv("LOG_LEVEL", "INFO").upper()
         self.llm_log_level = os.getenv("LLM_LOG_LEVEL", "LLM").upper()
@@ -110,9 +131,15 @@ class Config:
         elif self.bot_thread_depth_limit > 20:
             raise ValueError("BOT_THREAD_DEPTH_LIMIT must not exceed 20 to prevent excessive API calls")
         
+        # Validate search cache TTL
+        if self.bot_search_cache_ttl < 0:
+            raise ValueError("BOT_SEARCH_CACHE_TTL_SECONDS must not be negative")
+        
+        # Validate streaming edit interval
+        if self.bot_stream_edit_interval < 0:
+            raise ValueError("BOT_STREAM_EDIT_INTERVAL_SECONDS must not be negative")
+        
         # Log configuration (without sensitive data)
-        import logging
-        logger = logging.getLogger(__name__)
         logger.info(f"Configuration loaded:")
         logger.info(f"  Matrix homeserver: {self.matrix_homeserver_url}")
         logger.info(f"  Matrix user: {self.matrix_user_id}")
@@ -126,6 +153,8 @@ class Config:
         logger.info(f"  Bot debug mode: {self.bot_debug}")
         logger.info(f"  Bot reply behavior: {self.bot_reply_behavior}")
         logger.info(f"  Bot thread depth limit: {self.bot_thread_depth_limit}")
+        logger.info(f"  Bot search cache TTL: {self.bot_search_cache_ttl}s")
+        logger.info(f"  Bot stream responses: {self.bot_stream_responses}")
         logger.info(f"  UTM tags configured: {'Yes' if self.utm_tags else 'No'}")
         logger.info(f"  Log level: {self.log_level}")
         logger.info(f"  LLM log level: {self.llm_log_level}")
@@ -173,27 +202,20 @@ class Config:
         try:
             # Parse the URL
             parsed_url = urlparse(url)
-            query_params = parse_qs(parsed_url.query)
-            
-            # Parse UTM tags from environment variable
-            # Expected format: "utm_source=bot&utm_medium=matrix&utm_campaign=help"
-            utm_params = {}
-            for param in self.utm_tags.split('&'):
-                if '=' in param:
-                    key, value = param.split('=', 1)
-                    utm_params[key] = [value]
             
-            # Add UTM parameters to existing query parameters
-            query_params.update(utm_params)
+            if parsed_url.query:
+                # Add UTM parameters to existing query parameters
+                query_params = parse_qs(parsed_url.query)
+                query_params.update(self._utm_params)
+                new_query = urlencode(query_params, doseq=True)
+            else:
+                new_query = self._utm_query
             
             # Build the new URL with UTM tags
-            new_query = urlencode(query_params, doseq=True)
             new_parsed_url = parsed_url._replace(query=new_query)
             
             return urlunparse(new_parsed_url)
         except Exception as e:
             # If there's any error adding UTM tags, return the original URL
-            import logging
-            logger = logging.getLogger(__name__)
             logger.warning(f"Failed to add UTM tags to URL {url}: {e}")
             return url
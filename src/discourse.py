@@ -1,7 +1,10 @@
+import asyncio
+import html
 import logging
-import re
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Optional, Set
+from typing import List, Optional, Set, Tuple
 from urllib.parse import urljoin
 
 import aiohttp
@@ -11,6 +14,45 @@ from .responses import ResponseConfig
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of topic content requests in flight at once, to stay within
+# Discourse's rate limits when a search returns many results
+_TOPIC_FETCH_CONCURRENCY = 4
+
+
+def _strip_tags(text: str) -> str:
+    """
+    Strip HTML tags from cooked post content in a single forward scan.
+    
+    <br> tags become newlines and every other tag is dropped. A '<' with no
+    closing '>' (or directly followed by one) is kept as literal text.
+    """
+    # Plain-text posts need no scanning at all
+    if '<' not in text:
+        return text
+    parts = []
+    start = 0
+    pos = text.find('<')
+    while pos != -1:
+        end = text.find('>', pos + 1)
+        if end == -1:
+            break
+        if end == pos + 1:
+            # "<>" is not a tag; keep the '<' and look for the next one
+            pos = text.find('<', pos + 1)
+            continue
+        parts.append(text[start:pos])
+        if text[pos + 1:pos + 3].lower() == 'br':
+            # <br>, <br/> and <br /> (with any inner whitespace) become newlines
+            inner = text[pos + 3:end]
+            if inner.endswith('/'):
+                inner = inner[:-1]
+            if not inner or inner.isspace():
+                parts.append('\n')
+        start = end + 1
+        pos = text.find('<', start)
+    parts.append(text[start:])
+    return ''.join(parts)
+
 
 class DiscourseRateLimitError(Exception):
     """Raised when Discourse API rate limit is exceeded."""
@@ -37,19 +79,69 @@ class DiscoursePost:
     reply_count: int = 0
 
 
+class DiscourseSearchCache:
+    """Short-lived in-memory cache of Discourse search results keyed by normalized query."""
+    
+    def __init__(self, ttl_seconds: float = 900, max_entries: int = 256):
+        """
+        Initialize the search cache.
+        
+        Args:
+            ttl_seconds: How long cached results stay valid
+            max_entries: Maximum number of cached queries (least recently used are evicted)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[DiscoursePost]]]" = OrderedDict()
+    
+    @staticmethod
+    def _make_key(query: str, limit: int) -> Tuple[str, int]:
+        """Normalize case and whitespace so equivalent queries share an entry."""
+        return " ".join(query.casefold().split()), limit
+    
+    def get(self, query: str, limit: int) -> Optional[List[DiscoursePost]]:
+        """Return cached results for a query, or None on a miss or expired entry."""
+        key = self._make_key(query, limit)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, results = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return list(results)
+    
+    def set(self, query: str, limit: int, results: List[DiscoursePost]):
+        """Store results for a query. Empty results are not cached."""
+        key = self._make_key(query, limit)
+        if not results:
+            # An empty result may come from a transient failure; search again next time
+            self._entries.pop(key, None)
+            return
+        
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, list(results))
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
 class DiscourseSearcher:
     """Handles searching the Discourse forum for relevant posts."""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, response_config: Optional[ResponseConfig] = None):
         """Initialize the Discourse searcher."""
         self.config = config
         self.base_url = config.discourse_base_url.rstrip('/')
         self.session: Optional[aiohttp.ClientSession] = None
         
-        # Initialize response configuration
-        self.response_config = ResponseConfig()
+        # Initialize response configuration (shared with the bot when provided)
+        self.response_config = response_config if response_config is not None else ResponseConfig()
     
-    async def _get_session(self) -> aiohttp.ClientSession:
+    def _get_session(self) -> aiohttp.ClientSession:
         """Get or create an aiohttp session."""
         if not self.session or self.session.closed:
             headers = {
@@ -82,15 +174,33 @@ class DiscourseSearcher:
         logger.info(f"Searching Discourse for: '{query}' (limit: {limit})")
         results = await self._perform_search(query, limit)
         
-        # Fetch limited content for each result (first 1000 chars)
-        for post in results:
-            try:
-                limited_content = await self._fetch_limited_topic_content(post.topic_id, 1000)
-                post.excerpt = limited_content
-            except Exception as e:
-                logger.warning(f"Failed to fetch content for topic {post.topic_id}: {e}")
+        # Fetch limited content for each result (first 1000 chars), a few topics at a time
+        semaphore = asyncio.Semaphore(_TOPIC_FETCH_CONCURRENCY)
+        
+        async def fetch_content(topic_id: int) -> str:
+            async with semaphore:
+                return await self._fetch_limited_topic_content(topic_id, 1000)
+        
+        contents = await asyncio.gather(
+            *(fetch_content(post.topic_id) for post in results),
+            return_exceptions=True,
+        )
+        rate_limited = 0
+        for post, limited_content in zip(results, contents):
+            if isinstance(limited_content, DiscourseRateLimitError):
+                rate_limited += 1
+                # Fallback to existing excerpt
+                continue
+            if isinstance(limited_content, BaseException):
+                logger.warning(f"Failed to fetch content for topic {post.topic_id}: {limited_content}")
                 # Fallback to existing excerpt
-                pass
+                continue
+            post.excerpt = limited_content
+        if rate_limited:
+            logger.warning(
+                f"Rate limit hit when fetching topic content; using excerpts for "
+                f"{rate_limited} of {len(results)} results"
+            )
                 
         logger.info(f"Found {len(results)} results")
         return results
@@ -116,7 +226,7 @@ class DiscourseSearcher:
             List of DiscoursePost objects
         """
         try:
-            session = await self._get_session()
+            session = self._get_session()
             
             # Prepare search parameters
             search_url = urljoin(self.base_url, "/search.json")
@@ -264,20 +374,33 @@ class DiscourseSearcher:
     async def _fetch_limited_topic_content(self, topic_id: int, limit: int = 1000) -> str:
         """Fetch limited text content of a topic, strip HTML, return up to specified chars."""
         # Retrieve topic JSON including all posts
-        session = await self._get_session()
+        session = self._get_session()
         topic_url = urljoin(self.base_url, f"/t/{topic_id}.json")
         async with session.get(topic_url) as resp:
+            if resp.status == 429:
+                raise DiscourseRateLimitError(f"Rate limit exceeded fetching topic {topic_id}")
             if resp.status != 200:
                 raise RuntimeError(f"Failed to fetch topic {topic_id}: {resp.status}")
             data = await resp.json()
 
         # Extract and clean post contents
         content_parts = []
+        # Length of the "\n\n"-joined text so far (the first part has no separator)
+        content_length = -2
         for post in data.get("post_stream", {}).get("posts", []):
             cooked = post.get("cooked", "") or ""
-            # Strip HTML tags
-            text = re.sub(r'<[^>]+>', '', cooked)
+            if not cooked.strip():
+                continue
+            # Strip HTML tags, keeping line breaks as newlines
+            text = _strip_tags(cooked)
+            # Decode entities like &amp; and &quot;; skip the scan when there are none
+            if '&' in text:
+                text = html.unescape(text)
             content_parts.append(text)
+            # Later posts would be cut off by the limit anyway
+            content_length += len(text) + 2
+            if content_length >= limit:
+                break
 
         full_text = "\n\n".join(content_parts)
         # Limit to specified characters
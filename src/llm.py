@@ -1,57 +1,75 @@
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import re
+import time
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, Final, List, Optional, Tuple
+from urllib.parse import urlparse
 
-from openai import OpenAI, AsyncOpenAI
+from openai import AsyncOpenAI
+
+try:
+    import orjson
+    
+    _json_loads = orjson.loads
+except ImportError:
+    # Fall back to the standard library when orjson is not installed
+    _json_loads = json.loads
 
 try:
     from .config import Config
-    from .discourse import DiscoursePost, DiscourseSearcher, DiscourseRateLimitError, DiscourseConnectionError
+    from .discourse import DiscoursePost, DiscourseSearcher, DiscourseSearchCache, DiscourseRateLimitError, DiscourseConnectionError
     from .responses import ResponseConfig
     from .logging_utils import get_llm_logger, LLM_LEVEL
 except ImportError:
     # Fallback for direct execution
     from config import Config
-    from discourse import DiscoursePost, DiscourseSearcher, DiscourseRateLimitError, DiscourseConnectionError
+    from discourse import DiscoursePost, DiscourseSearcher, DiscourseSearchCache, DiscourseRateLimitError, DiscourseConnectionError
     from responses import ResponseConfig
     from logging_utils import get_llm_logger, LLM_LEVEL
 
 logger = get_llm_logger(__name__)
 
+# Define tools for the LLM - only search_discourse.
+# Kept at module level so the same schema object is reused and serializes
+# byte-identically across requests, which lets providers reuse their prompt
+# cache for the static prefix.
+_SEARCH_DISCOURSE_TOOL: Final[Dict[str, Any]] = {
+    "type": "function",
+    "function": {
+        "name": "search_discourse",
+        "description": "Search the Discourse forum for topics related to the user's query, search using keywords in the query language or in english.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query to execute."
+                }
+            },
+            "required": ["query"]
+        }
+    }
+}
 
-class LLMClient:
-    """Handles communication with Language Learning Models using tool calling."""
-    
-    def __init__(self, config: Config, discourse_searcher: DiscourseSearcher):
-        """Initialize the LLM client."""
-        self.config = config
-        self.discourse_searcher = discourse_searcher
-        
-        # Initialize response configuration
-        self.response_config = ResponseConfig()
-        
-        # Initialize OpenAI-compatible client
-        client_kwargs = config.get_openai_client_kwargs()
-        self.client = AsyncOpenAI(**client_kwargs)
-        
-        # Load system prompt
-        self.system_prompt = self._load_system_prompt()
-        
-        # Maximum search attempts
-        self.max_search_attempts = config.bot_max_search_iterations
-    
-    def _load_system_prompt(self) -> str:
-        """Load the system prompt from file."""
-        try:
-            with open("/app/system_prompt.md", "r", encoding="utf-8") as f:
-                return f.read().strip()
-        except FileNotFoundError:
-            # Fallback system prompt
-            return self._get_default_system_prompt()
-    
-    def _get_default_system_prompt(self) -> str:
-        """Get the default system prompt."""
-        return """# System Instructions for Forum AI Assistant
+_TOOLS: Final[List[Dict[str, Any]]] = [_SEARCH_DISCOURSE_TOOL]
+
+# Template for a single search result in the context sent to the LLM
+_RESULT_TEMPLATE: Final = "Result {i}:\nTitle: {title}\nURL: {url}\nContent: {excerpt}\n"
+
+# Compact form used for search results from earlier iterations (no excerpts)
+_RESULT_SUMMARY_TEMPLATE: Final = "Result {i}:\nTitle: {title}\nURL: {url}\n"
+
+# Tool replies for calls that are listed in the assistant turn but not executed
+_UNKNOWN_TOOL_REPLY: Final = "Unknown tool: {name}. Only search_discourse is available."
+_SEARCH_LIMIT_REPLY: Final = "Search limit reached. Answer with the results you already have."
+
+# Find URLs in responses (basic regex for http/https URLs)
+_URL_RE = re.compile(r'https?://[^\s<>"{}|\\^`[\]]*')
+
+# Fallback system prompt used when system_prompt.md is not available
+_DEFAULT_SYSTEM_PROMPT: Final = """# System Instructions for Forum AI Assistant
 
 You are an AI assistant for a community forum, specializing in answering questions by searching the Discourse forum. Your role is to help users find relevant information from the community's forum posts.
 
@@ -89,42 +107,79 @@ Search the Discourse forum for topics related to the user's query.
 - **Include Links**: When relevant topics are found, include the topic URLs in your response
 - **Relevance**: Ensure your response directly addresses the user's query
 - **Context Awareness**: When replying to a conversation, acknowledge the context from previous messages
-- **No Results**: If no relevant results are found, inform the user and suggest they visit the forum directly"""""
+- **No Results**: If no relevant results are found, inform the user and suggest they visit the forum directly"""
+
+# Stable cache routing key for OpenAI prompt caching (system prompt + tools prefix)
+_PROMPT_CACHE_KEY: Final = "askaosus-search-discourse"
+
+# prompt_cache_key and stream_options are only sent to the official API;
+# OpenAI-compatible servers behind a custom LLM_BASE_URL may reject unknown
+# request fields
+_OPENAI_API_HOST: Final = "api.openai.com"
+
+
+@lru_cache(maxsize=1)
+def _load_system_prompt_cached() -> str:
+    """Load the system prompt from file, reading it at most once per process."""
+    try:
+        with open("/app/system_prompt.md", "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        # Fallback system prompt
+        return _DEFAULT_SYSTEM_PROMPT
+
+
+class LLMClient:
+    """Handles communication with Language Learning Models using tool calling."""
     
-    async def process_question_with_tools(self, question: str) -> str:
+    def __init__(
+        self,
+        config: Config,
+        discourse_searcher: DiscourseSearcher,
+        search_cache: Optional[DiscourseSearchCache] = None,
+        response_config: Optional[ResponseConfig] = None,
+    ):
+        """Initialize the LLM client."""
+        self.config = config
+        self.discourse_searcher = discourse_searcher
+        self.search_cache = search_cache
+        
+        # Initialize response configuration (shared with the bot when provided)
+        self.response_config = response_config if response_config is not None else ResponseConfig()
+        
+        # Initialize OpenAI-compatible client
+        client_kwargs = config.get_openai_client_kwargs()
+        self.client = AsyncOpenAI(**client_kwargs)
+        self._is_openai_api = urlparse(config.llm_base_url or "").hostname == _OPENAI_API_HOST
+        
+        # Load system prompt (cached across clients)
+        self.system_prompt = _load_system_prompt_cached()
+        self._system_prompt_len = len(self.system_prompt)
+        
+        # Maximum search attempts
+        self.max_search_attempts = config.bot_max_search_iterations
+    
+    async def process_question_with_tools(
+        self,
+        question: str,
+        on_partial: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> str:
         """
         Process a question using LLM with tool calling capabilities.
         
         Args:
             question: The user's question
+            on_partial: Optional coroutine called with the accumulated answer text
+                while it is being streamed, at most once per
+                BOT_STREAM_EDIT_INTERVAL_SECONDS. When set, completions are
+                requested with stream=True.
             
         Returns:
             The final response message
         """
         try:
-            logger.llm(f"Processing question with tools: {question}")
-            logger.llm(f"System prompt length: {len(self.system_prompt)} characters")
-            
-            # Define tools for the LLM - only search_discourse
-            tools = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "search_discourse",
-                        "description": "Search the Discourse forum for topics related to the user's query, search using keywords in the query language or in english.",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "query": {
-                                    "type": "string",
-                                    "description": "The search query to execute."
-                                }
-                            },
-                            "required": ["query"]
-                        }
-                    }
-                }
-            ]
+            logger.llm("Processing question with tools: %s", question)
+            logger.llm("System prompt length: %d characters", self._system_prompt_len)
             
             # Prepare messages - using simple dict structure
             messages: List[Dict[str, Any]] = [
@@ -135,70 +190,138 @@ Search the Discourse forum for topics related to the user's query.
             # Track function calls
             search_attempts = 0
             final_response = None
-            response = None
+            usage = None
             tool_calls_executed = False
+            all_searches_empty = True
+            
+            # Tool messages from the latest iteration with their compact summaries
+            recent_tool_messages: List[Tuple[Dict[str, Any], str]] = []
+            
+            # Partial answers are only built and forwarded once per edit interval,
+            # counted across all turns of this question
+            next_partial_at = 0.0
+            
+            def partial_due() -> bool:
+                nonlocal next_partial_at
+                now = time.monotonic()
+                if now < next_partial_at:
+                    return False
+                next_partial_at = now + self.config.bot_stream_edit_interval
+                return True
             
             while search_attempts < self.max_search_attempts:
-                logger.llm(f"LLM attempt {search_attempts + 1}/{self.max_search_attempts}")
-                logger.llm(f"Sending {len(messages)} messages to LLM (model: {self.config.llm_model})")
+                logger.llm("LLM attempt %d/%d", search_attempts + 1, self.max_search_attempts)
+                logger.llm("Sending %d messages to LLM (model: %s)", len(messages), self.config.llm_model)
                 
                 # Prepare request parameters
                 request_params = {
                     "model": self.config.llm_model,
                     "messages": messages,
-                    "tools": tools,
+                    "tools": _TOOLS,
                     "tool_choice": "auto",
                     "max_tokens": self.config.llm_max_tokens,
                     "temperature": self.config.llm_temperature,
                 }
                 
+                extra_body: Dict[str, Any] = {}
+                
                 # Add OpenRouter provider configuration if available
                 openrouter_provider = self.config.get_openrouter_provider_config()
                 if openrouter_provider:
-                    request_params["extra_body"] = {"provider": openrouter_provider}
-                    logger.llm(f"Using OpenRouter provider config: {openrouter_provider}")
+                    extra_body["provider"] = openrouter_provider
+                    logger.llm("Using OpenRouter provider config: %s", openrouter_provider)
                 
-                # Call LLM with tools
-                response = await self.client.chat.completions.create(**request_params)
+                # Route requests with the same static prefix to the same prompt cache
+                if self._is_openai_api:
+                    extra_body["prompt_cache_key"] = _PROMPT_CACHE_KEY
                 
-                message = response.choices[0].message
+                if extra_body:
+                    request_params["extra_body"] = extra_body
                 
-                # Log the LLM response details
-                logger.llm(f"LLM response received - finish_reason: {response.choices[0].finish_reason}")
-                if message.content:
-                    logger.llm(f"LLM response content: {message.content}")
+                # Call LLM with tools
+                if on_partial is None:
+                    response = await self.client.chat.completions.create(**request_params)
+                    message = response.choices[0].message
+                    finish_reason = response.choices[0].finish_reason
+                    usage = response.usage
                 else:
-                    logger.llm("LLM response contains no text content (tool calls only)")
+                    message, finish_reason, usage = await self._stream_completion(request_params, on_partial, partial_due)
                 
-                if message.tool_calls:
-                    logger.llm(f"LLM requested {len(message.tool_calls)} tool call(s)")
-                    for i, tool_call in enumerate(message.tool_calls, 1):
-                        logger.llm(f"Tool call {i}: {tool_call.function.name}")
-                else:
-                    logger.llm("LLM made no tool calls")
+                # Log the LLM response details (skipped entirely below the LLM level)
+                if logger.isEnabledFor(LLM_LEVEL):
+                    logger.llm("LLM response received - finish_reason: %s", finish_reason)
+                    if message.content:
+                        logger.llm("LLM response content: %s", message.content)
+                    else:
+                        logger.llm("LLM response contains no text content (tool calls only)")
+                    
+                    if message.tool_calls:
+                        logger.llm("LLM requested %d tool call(s)", len(message.tool_calls))
+                        for i, tool_call in enumerate(message.tool_calls, 1):
+                            logger.llm("Tool call %d: %s", i, tool_call.function.name)
+                    else:
+                        logger.llm("LLM made no tool calls")
                 
                 # Check if the LLM wants to use tools
                 if message.tool_calls:
                     tool_calls_executed = True
+                    
+                    # Earlier search results are re-sent on every call; keep only titles
+                    # and URLs for them so the prompt doesn't grow with every excerpt
+                    for tool_message, summary in recent_tool_messages:
+                        tool_message["content"] = summary
+                    recent_tool_messages = []
+                    
+                    # Echo the assistant turn once with all of its tool calls; the
+                    # arguments are already a JSON string, so pass them through as-is
+                    messages.append({
+                        "role": "assistant",
+                        "content": message.content or "",
+                        "tool_calls": [
+                            {
+                                "id": tool_call.id,
+                                "type": "function",
+                                "function": {
+                                    "name": tool_call.function.name,
+                                    "arguments": tool_call.function.arguments
+                                }
+                            }
+                            for tool_call in message.tool_calls
+                        ]
+                    })
+                    
                     for tool_call in message.tool_calls:
                         function_name = tool_call.function.name
-                        function_args = json.loads(tool_call.function.arguments)
+                        function_args = _json_loads(tool_call.function.arguments)
                         
-                        logger.llm(f"Executing function: {function_name}")
-                        logger.debug(f"Function arguments: {function_args}")
+                        logger.llm("Executing function: %s", function_name)
+                        logger.debug("Function arguments: %s", function_args)
                         
-                        if function_name == "search_discourse":
-                            if search_attempts >= self.max_search_attempts:
-                                # Stop searching if max attempts reached
-                                logger.llm("Maximum search attempts reached, stopping search")
-                                break
-                                
+                        if function_name != "search_discourse":
+                            # Every listed tool call needs a reply, or the next request is rejected
+                            logger.warning("LLM called unknown function: %s", function_name)
+                            messages.append({
+                                "role": "tool",
+                                "tool_call_id": tool_call.id,
+                                "content": _UNKNOWN_TOOL_REPLY.format(name=function_name),
+                            })
+                        elif search_attempts >= self.max_search_attempts:
+                            # Stop searching if max attempts reached, but still answer the call
+                            logger.llm("Maximum search attempts reached, stopping search")
+                            messages.append({
+                                "role": "tool",
+                                "tool_call_id": tool_call.id,
+                                "content": _SEARCH_LIMIT_REPLY,
+                            })
+                        else:
                             query = function_args.get("query", "")
-                            logger.llm(f"Searching Discourse with query: '{query}'")
+                            logger.llm("Searching Discourse with query: '%s'", query)
                             
                             try:
-                                search_results = await self.discourse_searcher.search(query, self.config.bot_max_search_results)
-                                logger.llm(f"Discourse search returned {len(search_results)} results")
+                                search_results = await self._search_discourse(query)
+                                logger.llm("Discourse search returned %d results", len(search_results))
+                                if search_results:
+                                    all_searches_empty = False
                             except DiscourseRateLimitError:
                                 logger.warning("Discourse rate limit hit during search")
                                 return self.response_config.get_error_message("rate_limit_error")
@@ -208,43 +331,33 @@ Search the Discourse forum for topics related to the user's query.
                             
                             # Format search results for the LLM
                             search_context = self._format_search_results(search_results)
-                            logger.llm(f"Formatted search context length: {len(search_context)} characters")
+                            logger.llm("Formatted search context length: %d characters", len(search_context))
                             
                             # Log the raw search context being sent to the LLM
-                            if search_results:
-                                logger.llm("Raw search context sent to LLM:")
-                                logger.llm(search_context)
-                            else:
-                                logger.llm("No search results to send to LLM")
+                            if logger.isEnabledFor(LLM_LEVEL):
+                                if search_results:
+                                    logger.llm("Raw search context sent to LLM:")
+                                    logger.llm(search_context)
+                                else:
+                                    logger.llm("No search results to send to LLM")
                             
-                            messages.append({
-                                "role": "assistant",
-                                "content": "",
-                                "tool_calls": [
-                                    {
-                                        "id": tool_call.id,
-                                        "type": "function",
-                                        "function": {
-                                            "name": function_name,
-                                            "arguments": json.dumps(function_args)
-                                        }
-                                    }
-                                ]
-                            })
-                            
-                            messages.append({
+                            tool_message = {
                                 "role": "tool",
                                 "tool_call_id": tool_call.id,
                                 "content": search_context
-                            })
+                            }
+                            messages.append(tool_message)
+                            recent_tool_messages.append(
+                                (tool_message, self._format_search_results(search_results, include_excerpts=False))
+                            )
                             
                             search_attempts += 1
-                            logger.llm(f"Search context added to conversation, continuing to next LLM call")
+                            logger.llm("Search context added to conversation, continuing to next LLM call")
                 
                 # If no tool calls and we have content, use it as final response
                 if message.content and not message.tool_calls:
                     final_response = message.content.strip()
-                    logger.llm(f"Using LLM direct response: {final_response}")
+                    logger.llm("Using LLM direct response: %s", final_response)
                     break
                 
                 # Log if we're continuing to next iteration
@@ -256,20 +369,24 @@ Search the Discourse forum for topics related to the user's query.
             
             # If no final response, provide a fallback
             if not final_response:
-                if search_attempts > 0:
+                if search_attempts >= self.max_search_attempts and all_searches_empty:
+                    # Every search came back empty: answer deterministically instead of
+                    # spending another LLM round on an empty context
+                    final_response = self.response_config.get_error_message("no_search_results")
+                elif search_attempts > 0:
                     # Had search results but LLM didn't provide good response
                     final_response = "I searched the forum but couldn't find a good answer to your question. Please try rephrasing or visit the forum directly: https://discourse.aosus.org"
                 else:
                     # No searches performed
                     final_response = "I couldn't process your question. Please try again or visit the forum directly: https://discourse.aosus.org"
                 
-                logger.llm(f"Using fallback response: {final_response}")
+                logger.llm("Using fallback response: %s", final_response)
             
             # Log token usage
-            if response and hasattr(response, 'usage') and response.usage:
-                logger.llm(f"Token usage - prompt: {response.usage.prompt_tokens}, completion: {response.usage.completion_tokens}, total: {response.usage.total_tokens}")
+            if usage:
+                logger.llm("Token usage - prompt: %s, completion: %s, total: %s", usage.prompt_tokens, usage.completion_tokens, usage.total_tokens)
             
-            logger.llm(f"Question processing completed successfully")
+            logger.llm("Question processing completed successfully")
             
             # Apply UTM tags to any URLs in the final response
             final_response = self._add_utm_tags_to_response(final_response)
@@ -278,44 +395,129 @@ Search the Discourse forum for topics related to the user's query.
             
         except Exception as e:
             logger.error(f"Error processing question with tools: {e}", exc_info=True)
-            logger.llm(f"PROCESSING ERROR - Exception occurred: {type(e).__name__}: {e}")
+            logger.llm("PROCESSING ERROR - Exception occurred: %s: %s", type(e).__name__, e)
             return self.response_config.get_error_message("llm_down")
     
-    def _format_search_results(self, search_results: List[DiscoursePost]) -> str:
-        """Format search results for the LLM."""
+    async def _search_discourse(self, query: str) -> List[DiscoursePost]:
+        """Search Discourse, serving repeated queries from the search cache when available."""
+        limit = self.config.bot_max_search_results
+        
+        if self.search_cache is not None:
+            cached_results = self.search_cache.get(query, limit)
+            if cached_results is not None:
+                logger.llm("Using cached Discourse results for query: '%s'", query)
+                return cached_results
+        
+        search_results = await self.discourse_searcher.search(query, limit)
+        
+        if self.search_cache is not None:
+            self.search_cache.set(query, limit, search_results)
+        
+        return search_results
+    
+    async def _stream_completion(
+        self,
+        request_params: Dict[str, Any],
+        on_partial: Callable[[str], Awaitable[None]],
+        partial_due: Callable[[], bool],
+    ) -> Tuple[SimpleNamespace, Optional[str], Any]:
+        """
+        Request a streamed completion and rebuild the assistant message from its deltas.
+        
+        The text so far is forwarded to ``on_partial`` whenever ``partial_due``
+        allows it, as long as the model has not started emitting tool calls in
+        this turn. Text that comes before a tool call is therefore surfaced too;
+        the caller replaces it with the final answer.
+        
+        Returns:
+            Tuple of (message, finish_reason, usage) mirroring a non-streamed response
+        """
+        stream_params: Dict[str, Any] = {"stream": True}
+        if self._is_openai_api:
+            # Usage is only reported in a final chunk when it is requested explicitly
+            stream_params["stream_options"] = {"include_usage": True}
+        stream = await self.client.chat.completions.create(**request_params, **stream_params)
+        
+        content_parts: List[str] = []
+        tool_calls: Dict[int, Dict[str, str]] = {}
+        finish_reason = None
+        usage = None
+        
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            
+            choice = chunk.choices[0]
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+            
+            delta = choice.delta
+            if delta.tool_calls:
+                for tool_call_delta in delta.tool_calls:
+                    entry = tool_calls.setdefault(
+                        tool_call_delta.index, {"id": "", "name": "", "arguments": ""}
+                    )
+                    if tool_call_delta.id:
+                        entry["id"] = tool_call_delta.id
+                    if tool_call_delta.function:
+                        if tool_call_delta.function.name:
+                            entry["name"] += tool_call_delta.function.name
+                        if tool_call_delta.function.arguments:
+                            entry["arguments"] += tool_call_delta.function.arguments
+            
+            if delta.content:
+                content_parts.append(delta.content)
+                # Only surface text that is meant as an answer, not tool-call chatter,
+                # and only join the parts when an edit is due
+                if not tool_calls and partial_due():
+                    await on_partial("".join(content_parts))
+        
+        message = SimpleNamespace(
+            content="".join(content_parts) or None,
+            tool_calls=[
+                SimpleNamespace(
+                    id=entry["id"],
+                    type="function",
+                    function=SimpleNamespace(name=entry["name"], arguments=entry["arguments"]),
+                )
+                for _, entry in sorted(tool_calls.items())
+            ] or None,
+        )
+        return message, finish_reason, usage
+    
+    def _format_search_results(self, search_results: List[DiscoursePost], include_excerpts: bool = True) -> str:
+        """Format search results for the LLM, optionally without the post excerpts."""
         if not search_results:
             return self.response_config.get_discourse_message("no_results")
         
-        formatted_results = []
-        for i, post in enumerate(search_results, 1):
-            formatted_results.append(
-                f"Result {i}:\n"
-                f"Title: {post.title}\n"
-                f"URL: {post.url}\n"
-                f"Content: {post.excerpt}\n"
-            )
+        template = _RESULT_TEMPLATE if include_excerpts else _RESULT_SUMMARY_TEMPLATE
+        formatted_results = [
+            template.format(i=i, title=post.title, url=post.url, excerpt=post.excerpt)
+            for i, post in enumerate(search_results, 1)
+        ]
         
         return "\n".join(formatted_results)
     
     def _add_utm_tags_to_response(self, response: str) -> str:
         """Add UTM tags to any URLs found in the response."""
-        import re
+        # Most responses without links can skip the regex entirely
+        if 'http' not in response:
+            return response
         
-        # Find URLs in the response (basic regex for http/https URLs)
-        url_pattern = r'https?://[^\s<>"{}|\\^`[\]]*'
+        # The same topic is often cited several times in one response. The memo
+        # only lives for this call: URLs in model output are unbounded, so a
+        # process-wide cache would grow without limit and rarely hit
+        seen: Dict[str, str] = {}
         
         def replace_url(match):
             url = match.group(0)
-            return self.config.add_utm_tags_to_url(url)
+            tagged_url = seen.get(url)
+            if tagged_url is None:
+                tagged_url = self.config.add_utm_tags_to_url(url)
+                seen[url] = tagged_url
+            return tagged_url
         
         # Replace all URLs with UTM-tagged versions
-        return re.sub(url_pattern, replace_url, response)
-    
-    # Legacy method for backward compatibility
-    async def generate_answer(self, question: str, search_results: List[DiscoursePost]) -> str:
-        """
-        Legacy method - use process_question_with_tools instead.
-        This method is kept for backward compatibility but will be removed.
-        """
-        logger.warning("Using deprecated generate_answer method")
-        return await self.process_question_with_tools(question)
+        return _URL_RE.sub(replace_url, response)
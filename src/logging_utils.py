@@ -7,7 +7,10 @@ This module provides custom logging functionality including:
 - Log filtering capabilities
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from typing import Optional
@@ -17,6 +20,19 @@ from typing import Optional
 LLM_LEVEL = 25
 LLM_LEVEL_NAME = 'LLM'
 
+# Rotate bot.log once it reaches this size, keeping a few old files
+LOG_FILE_MAX_BYTES = 50_000_000
+LOG_FILE_BACKUP_COUNT = 5
+
+# Background listener that writes queued log records to the real handlers
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _llm(self, message, *args, **kwargs):
+    """Log a message with severity 'LLM'."""
+    if self.isEnabledFor(LLM_LEVEL):
+        self._log(LLM_LEVEL, message, args, **kwargs)
+
 
 def add_llm_log_level():
     """Add the custom LLM log level to the logging module."""
@@ -26,35 +42,24 @@ def add_llm_log_level():
     # Add the level as an attribute to the logging module
     setattr(logging, LLM_LEVEL_NAME, LLM_LEVEL)
     
-    # Add a method to logger class for the new level
-    def llm(self, message, *args, **kwargs):
-        """Log a message with severity 'LLM'."""
-        if self.isEnabledFor(LLM_LEVEL):
-            self._log(LLM_LEVEL, message, args, **kwargs)
-    
     # Add the method to Logger class
-    logging.Logger.llm = llm
+    logging.Logger.llm = _llm
+
+
+# Register the level once on import so every logger has .llm() available
+add_llm_log_level()
 
 
 class MatrixNioFilter(logging.Filter):
     """Filter to exclude matrix-nio logs when needed."""
     
+    # Logger name prefixes of nio and related matrix libraries; prefixes also
+    # cover child loggers such as nio.client and aiohttp.access
+    EXCLUDED_PREFIXES = ('nio', 'aiohttp', 'urllib3')
+    
     def filter(self, record):
         """Filter out matrix-nio related log records."""
-        # Exclude logs from nio and related matrix libraries
-        excluded_loggers = [
-            'nio',
-            'nio.client',
-            'nio.api',
-            'nio.events',
-            'nio.http',
-            'nio.store',
-            'aiohttp',
-            'aiohttp.access',
-            'urllib3'
-        ]
-        
-        return not any(record.name.startswith(excluded) for excluded in excluded_loggers)
+        return not record.name.startswith(self.EXCLUDED_PREFIXES)
 
 
 def configure_logging(log_level: str = 'INFO', 
@@ -68,9 +73,6 @@ def configure_logging(log_level: str = 'INFO',
         logs_dir: Directory for log files
         exclude_matrix_nio: Whether to filter out matrix-nio logs
     """
-    # Ensure custom LLM level is available
-    add_llm_log_level()
-    
     # Create logs directory if it doesn't exist
     Path(logs_dir).mkdir(exist_ok=True)
     
@@ -89,7 +91,12 @@ def configure_logging(log_level: str = 'INFO',
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
     
-    file_handler = logging.FileHandler(f'{logs_dir}/bot.log')
+    file_handler = logging.handlers.RotatingFileHandler(
+        f'{logs_dir}/bot.log',
+        maxBytes=LOG_FILE_MAX_BYTES,
+        backupCount=LOG_FILE_BACKUP_COUNT,
+        encoding='utf-8',
+    )
     file_handler.setFormatter(formatter)
     
     # Apply matrix-nio filter if requested
@@ -102,12 +109,20 @@ def configure_logging(log_level: str = 'INFO',
     root_logger = logging.getLogger()
     root_logger.setLevel(numeric_level)
     
-    # Clear existing handlers
+    # Clear existing handlers and stop a listener from a previous configuration
     root_logger.handlers.clear()
+    stop_logging()
+    
+    # Hand records to a queue so console and file I/O happen on a background
+    # thread instead of blocking the event loop
+    global _queue_listener
+    log_queue = queue.Queue(-1)
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _queue_listener.start()
     
-    # Add our handlers
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     # Configure specific loggers for better control
     
@@ -126,6 +141,22 @@ def configure_logging(log_level: str = 'INFO',
             logging.getLogger(logger_name).setLevel(logging.ERROR)
 
 
+def stop_logging():
+    """Stop the background log listener, flushing queued records and closing handlers."""
+    global _queue_listener
+    if _queue_listener is None:
+        return
+    
+    _queue_listener.stop()
+    for handler in _queue_listener.handlers:
+        handler.close()
+    _queue_listener = None
+
+
+# Make sure queued records are written when the process exits
+atexit.register(stop_logging)
+
+
 def get_llm_logger(name: str) -> logging.Logger:
     """
     Get a logger configured for LLM operations.
@@ -134,9 +165,6 @@ def get_llm_logger(name: str) -> logging.Logger:
         name: Logger name (usually __name__)
         
     Returns:
-        Logger instance with LLM level support
+        Logger instance with LLM level support (registered on import)
     """
-    # Ensure custom level is available
-    add_llm_log_level()
-    
     return logging.getLogger(name)
\ No newline at end of file
@@ -1,27 +1,38 @@
 import asyncio
 import logging
+import os
 import signal
 import sys
 from pathlib import Path
 
-from dotenv import load_dotenv
-# Load .env file without overwriting existing environment variables
-load_dotenv(override=False)
+# Load .env file without overwriting existing environment variables. Skip it when
+# the environment is already provided (e.g. by Docker) or SKIP_DOTENV=1 is set
+if os.environ.get("SKIP_DOTENV") != "1" and not os.environ.get("MATRIX_HOMESERVER_URL"):
+    from dotenv import load_dotenv
+    load_dotenv(override=False)
 
-from .bot import AskaosusBot
 from .config import Config
 from .logging_utils import configure_logging
 
 logger = logging.getLogger(__name__)
 
+# Tasks started from signal handlers
+_background_tasks = set()
 
-def signal_handler(bot: AskaosusBot):
-    """Handle shutdown signals gracefully by shutting down the bot and stopping the event loop."""
-    def handler(signum, frame):
-        logger.info(f"Received signal {signum}, shutting down...")
-        # Schedule bot shutdown; sync_forever will exit when client is closed
-        asyncio.get_event_loop().create_task(bot.shutdown())
-    return handler
+
+def _handle_shutdown_signal(stop_event: asyncio.Event, signum: int):
+    """Handle shutdown signals by waking up main(), which shuts the bot down."""
+    logger.info(f"Received signal {signum}, shutting down...")
+    stop_event.set()
+
+
+def _handle_reload_signal(bot, signum: int):
+    """Handle SIGHUP by reloading responses.json in the background."""
+    logger.info(f"Received signal {signum}, reloading response config...")
+    task = asyncio.create_task(bot.response_config.reload_async())
+    # Keep a reference until the reload finishes so the task is not garbage collected
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 
 async def test_discourse_search(config: Config):
@@ -63,25 +74,69 @@ async def main():
             logger.info("Debug mode enabled, testing Discourse search...")
             await test_discourse_search(config)
         
+        # Import the bot (and with it nio, aiohttp and the LLM client) only once
+        # logging is configured and the bot is actually going to run
+        from .bot import AskaosusBot
+        
         # Create bot instance
         bot = AskaosusBot(config)
         
-        # Setup signal handlers
-        signal.signal(signal.SIGINT, signal_handler(bot))
-        signal.signal(signal.SIGTERM, signal_handler(bot))
+        # Setup signal handlers; they only set stop_event, shutdown happens below
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        if sys.platform != "win32":
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, _handle_shutdown_signal, stop_event, signum)
+            # SIGHUP reloads responses.json without restarting the bot
+            loop.add_signal_handler(signal.SIGHUP, _handle_reload_signal, bot, signal.SIGHUP)
+        else:
+            # The event loop cannot register signal handlers on Windows; hand the
+            # signal over to the loop thread since asyncio.Event is not thread-safe
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(
+                    signum,
+                    lambda signum, frame: loop.call_soon_threadsafe(_handle_shutdown_signal, stop_event, signum),
+                )
         
-        # Start the bot
+        # Start the bot and run until it stops or a shutdown signal arrives
         logger.info("Starting Askaosus Matrix Bot...")
-        await bot.start()
+        bot_task = asyncio.create_task(bot.start())
+        stop_task = asyncio.create_task(stop_event.wait())
+        done, _ = await asyncio.wait({bot_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        
+        stop_task.cancel()
+        if bot_task not in done:
+            bot_task.cancel()
+            try:
+                await bot_task
+            except asyncio.CancelledError:
+                pass
+        
+        await bot.shutdown()
+        
+        # Surface errors from the bot itself
+        if bot_task in done:
+            bot_task.result()
         
     except Exception as e:
         logger.error(f"Fatal error: {e}", exc_info=True)
         sys.exit(1)
 
 
+def run():
+    """Run the bot on uvloop when it is installed, otherwise on the default event loop."""
+    try:
+        import uvloop
+    except ImportError:
+        # uvloop is unavailable on Windows; the default loop works everywhere
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
+
+
 if __name__ == "__main__":
     # Ensure logs directory exists
     Path("/app/logs").mkdir(exist_ok=True)
     
     # Run the bot
-    asyncio.run(main())
+    run()
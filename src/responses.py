@@ -1,11 +1,66 @@
+import asyncio
 import json
 import logging
 import os
+import sys
+from collections.abc import Mapping
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import orjson
+    
+    _json_loads = orjson.loads
+except ImportError:
+    # Fall back to the standard library when orjson is not installed
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Returned when a response category or key is not configured
+_GENERIC_ERROR = "Sorry, an unexpected error occurred"
+
+
+@lru_cache(maxsize=1)
+def _find_responses_path() -> str:
+    """Return the first existing responses.json location, or the production path."""
+    # Try different locations in order of preference
+    possible_paths = [
+        "/app/responses.json",  # Production Docker path
+        "responses.json",  # Development path (current directory)
+        os.path.join(os.path.dirname(__file__), "..", "responses.json"),  # Relative to src/
+    ]
+    
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    
+    return possible_paths[0]  # Default to production path
+
+
+def _parse_responses_file(path: str) -> Mapping:
+    """
+    Read and parse a responses file.
+    
+    The result is shared by every ResponseConfig, so it is returned as a
+    read-only mapping (categories included) to prevent accidental mutation.
+    """
+    data = _json_loads(Path(path).read_bytes())
+    if not isinstance(data, dict):
+        return data
+    return MappingProxyType({
+        category: MappingProxyType(category_responses) if isinstance(category_responses, dict) else category_responses
+        for category, category_responses in data.items()
+    })
+
+
+@lru_cache(maxsize=None)
+def _load_cached(path: str) -> Mapping:
+    """Parse a responses file once per path; it only changes on an explicit reload."""
+    return _parse_responses_file(path)
+
 
 class ResponseConfig:
     """Manages configurable responses for the bot."""
@@ -13,33 +68,22 @@ class ResponseConfig:
     def __init__(self, config_path: Optional[str] = None):
         """Initialize the response configuration."""
         if config_path is None:
-            # Try different locations in order of preference
-            possible_paths = [
-                "/app/responses.json",  # Production Docker path
-                "responses.json",  # Development path (current directory)
-                os.path.join(os.path.dirname(__file__), "..", "responses.json"),  # Relative to src/
-            ]
-            
-            self.config_path = None
-            for path in possible_paths:
-                if os.path.exists(path):
-                    self.config_path = path
-                    break
-            
-            if not self.config_path:
-                self.config_path = possible_paths[0]  # Default to production path
+            self.config_path = _find_responses_path()
         else:
             self.config_path = config_path
             
         self.responses = self._load_responses()
+        
+        # Responses are never modified after loading, so flatten them once into a
+        # single (category, key) -> message table for lookups
+        self._flat_responses = self._flatten_responses(self.responses)
     
-    def _load_responses(self) -> Dict[str, Any]:
+    def _load_responses(self) -> Mapping:
         """Load responses from the configuration file."""
         try:
             config_file = Path(self.config_path)
             if config_file.exists():
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return _load_cached(str(config_file))
             else:
                 logger.warning(f"Response config file not found at {self.config_path}, using defaults")
                 return self._get_default_responses()
@@ -47,13 +91,43 @@ class ResponseConfig:
             logger.error(f"Error loading response config: {e}, using defaults")
             return self._get_default_responses()
     
+    async def reload_async(self) -> bool:
+        """
+        Re-read the configuration file without blocking the event loop.
+        
+        The file is read and parsed in a worker thread. If it is missing, is
+        not valid JSON, or does not contain a JSON object, the currently loaded
+        responses are kept.
+        
+        Returns:
+            True if the responses were reloaded, False otherwise
+        """
+        try:
+            responses = await asyncio.to_thread(_parse_responses_file, self.config_path)
+        except Exception as e:
+            logger.error(f"Error reloading response config from {self.config_path}: {e}, keeping current responses")
+            return False
+        
+        if not isinstance(responses, Mapping):
+            logger.error(f"Response config at {self.config_path} must be a JSON object, keeping current responses")
+            return False
+        
+        # Later instances should see the new file contents as well
+        _load_cached.cache_clear()
+        
+        self.responses = responses
+        self._flat_responses = self._flatten_responses(responses)
+        logger.info(f"Reloaded response config from {self.config_path}")
+        return True
+    
     def _get_default_responses(self) -> Dict[str, Any]:
         """Get default hardcoded responses as fallback."""
         return {
             "error_messages": {
                 "rate_limit_error": "The forum is currently receiving too many requests. Please try again in a few moments.",
                 "discourse_unreachable": "The forum is currently unreachable. Please try again later or visit the forum directly: https://discourse.aosus.org",
-                "llm_down": "The AI assistant is currently unavailable. Please try again later or visit the forum directly: https://discourse.aosus.org"
+                "llm_down": "The AI assistant is currently unavailable. Please try again later or visit the forum directly: https://discourse.aosus.org",
+                "no_search_results": "I couldn't find any forum topics related to your question. Please try rephrasing or visit the forum directly: https://discourse.aosus.org"
             },
             "discourse_messages": {
                 "no_results": "No relevant topics found.",
@@ -63,6 +137,35 @@ class ResponseConfig:
             }
         }
     
+    def _flatten_responses(self, responses: Mapping) -> Dict[Tuple[str, str], str]:
+        """
+        Build the (category, key) -> message lookup table, skipping empty messages.
+        
+        The built-in defaults are added first, so keys missing from a custom
+        responses file (for example ones added in a newer release) still resolve.
+        """
+        flat_responses = {}
+        self._add_flat_responses(flat_responses, self._get_default_responses())
+        if not isinstance(responses, Mapping):
+            logger.error("Response config must be a JSON object, using default responses")
+            return flat_responses
+        
+        self._add_flat_responses(flat_responses, responses)
+        return flat_responses
+    
+    @staticmethod
+    def _add_flat_responses(flat_responses: Dict[Tuple[str, str], str], responses: Mapping):
+        """Add every non-empty message in responses to the flat lookup table."""
+        for category, category_responses in responses.items():
+            if not isinstance(category_responses, Mapping):
+                logger.warning(f"Ignoring response category {category}: expected an object")
+                continue
+            # Intern the keys so lookups with literal names compare by identity
+            category = sys.intern(category)
+            for key, message in category_responses.items():
+                if message:
+                    flat_responses[(category, sys.intern(key))] = message
+    
     def get_response(self, category: str, key: str) -> str:
         """
         Get a response message.
@@ -72,21 +175,10 @@ class ResponseConfig:
             key: Specific response key
             
         Returns:
-            The response message, falling back to a generic error message if not found
+            The response message, falling back to the built-in default and then to
+            a generic error message if not found
         """
-        try:
-            category_responses = self.responses.get(category, {})
-            message = category_responses.get(key)
-            
-            if message:
-                return message
-            else:
-                # Final fallback to a generic message
-                return "Sorry, an unexpected error occurred"
-                
-        except Exception as e:
-            logger.error(f"Error getting response {category}.{key}: {e}")
-            return "Sorry, an unexpected error occurred"
+        return self._flat_responses.get((category, key), _GENERIC_ERROR)
     
     def get_error_message(self, error_type: str) -> str:
         """Get an error message."""
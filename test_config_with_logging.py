@@ -12,10 +12,15 @@ import os
 import sys
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 # Add src to Python path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
+from src.config import Config
+from src.logging_utils import configure_logging, get_llm_logger
+
+
 def test_configuration_with_logging():
     """Test configuration loading with new logging options."""
     print("=== Testing Configuration with Logging Options ===")
@@ -31,15 +36,8 @@ def test_configuration_with_logging():
         'EXCLUDE_MATRIX_NIO_LOGS': 'true'
     }
     
-    # Set environment variables
-    for key, value in test_env.items():
-        os.environ[key] = value
-    
-    try:
-        # Import and test configuration
-        from src.config import Config
-        from src.logging_utils import configure_logging, get_llm_logger
-        
+    # Set environment variables for the duration of the test only
+    with patch.dict(os.environ, test_env):
         # Load configuration
         config = Config()
         
@@ -74,12 +72,6 @@ def test_configuration_with_logging():
             print("✓ Log file handling working")
         
         return True
-        
-    finally:
-        # Clean up environment variables
-        for key in test_env.keys():
-            if key in os.environ:
-                del os.environ[key]
 
 
 def test_logging_import():
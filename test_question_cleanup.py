@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test how questions are extracted from messages that mention the bot.
+
+This test validates:
+1. A ':' or ',' directly after the mention is removed with it
+2. Other leading characters, such as a dash starting a flag, are kept
+3. Line breaks inside direct-mention questions are kept
+4. Reply content gets the same separator handling
+"""
+
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# Add src to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+TEST_ENV = {
+    "MATRIX_HOMESERVER_URL": "https://matrix.test.org",
+    "MATRIX_USER_ID": "@testbot:matrix.test.org",
+    "MATRIX_PASSWORD": "test_password",
+    "LLM_API_KEY": "test_key",
+    "BOT_MENTIONS": "@askaosus,askaosus",
+}
+
+
+def make_bot():
+    """Create a bot with a mocked Matrix client."""
+    from src.config import Config
+    from src.bot import AskaosusBot
+    
+    with patch.dict(os.environ, TEST_ENV):
+        config = Config()
+        bot = AskaosusBot(config)
+    
+    bot.matrix_client = MagicMock()
+    return bot
+
+
+async def test_direct_mention_questions():
+    """Test the question extracted from direct mentions."""
+    print("=== Testing Direct Mention Questions ===")
+    
+    bot = make_bot()
+    room = SimpleNamespace(room_id="!test:matrix.org")
+    
+    test_cases = [
+        ("@askaosus how do I install Ubuntu?", "how do I install Ubuntu?", "Plain mention"),
+        ("@askaosus: how do I install Ubuntu?", "how do I install Ubuntu?", "Colon after the mention"),
+        ("@askaosus, how do I install Ubuntu?", "how do I install Ubuntu?", "Comma after the mention"),
+        ("@askaosus -v flag?", "-v flag?", "Leading dash is part of the question"),
+        ("@askaosus - what does this do?", "- what does this do?", "Dash after a space is kept"),
+        ("@askaosus :wq in vim?", ":wq in vim?", "Colon after a space is kept"),
+        ("@askaosus first line\nsecond line", "first line\nsecond line", "Line breaks are kept"),
+    ]
+    
+    for body, expected, description in test_cases:
+        event = SimpleNamespace(event_id="$question", sender="@user:matrix.org", body=body, source={'content': {}})
+        question, should_respond, _ = await bot._should_respond(room, event)
+        assert should_respond, f"{description}: bot should respond to {body!r}"
+        assert question == expected, f"{description}: expected {expected!r}, got {question!r}"
+        print(f"✓ {description}")
+    
+    # A message that is only a mention and a separator has no question
+    event = SimpleNamespace(event_id="$question", sender="@user:matrix.org", body="@askaosus:", source={'content': {}})
+    question, should_respond, _ = await bot._should_respond(room, event)
+    assert not should_respond, "Bot should not respond to a bare mention"
+    print("✓ Bare mention with a separator is ignored")
+    
+    return True
+
+
+def test_reply_content():
+    """Test separator handling in cleaned reply content."""
+    print("\n=== Testing Reply Content ===")
+    
+    bot = make_bot()
+    bot_mentions = ["@askaosus", "askaosus"]
+    
+    test_cases = [
+        ("@askaosus: what about this?", "what about this?", "Colon after the mention"),
+        ("@askaosus -v flag?", "-v flag?", "Leading dash is part of the question"),
+        ("> quoted\n@askaosus, and this?", "and this?", "Comma after the mention with a quote"),
+    ]
+    
+    for body, expected, description in test_cases:
+        result = bot._clean_reply_content(body, bot_mentions)
+        assert result == expected, f"{description}: expected {expected!r}, got {result!r}"
+        print(f"✓ {description}")
+    
+    return True
+
+
+async def main():
+    """Run all question cleanup tests."""
+    print("Testing question extraction...\n")
+    
+    try:
+        await test_direct_mention_questions()
+        test_reply_content()
+        
+        print("\n🎉 All question cleanup tests passed!")
+        return 0
+    
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    sys.exit(exit_code)
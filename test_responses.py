@@ -4,6 +4,7 @@ Test script for configurable responses functionality.
 """
 import sys
 import os
+import asyncio
 import tempfile
 import json
 from pathlib import Path
@@ -102,12 +103,99 @@ def test_integration():
     return True
 
 
+def test_missing_keys_use_defaults():
+    """Test that keys missing from a custom file fall back to the built-in defaults."""
+    print("\nTesting fallback to built-in defaults...")
+    
+    # An older or translated responses.json without newer keys such as no_search_results
+    custom_responses = {
+        "error_messages": {
+            "llm_down": "L'assistant IA est actuellement indisponible."
+        }
+    }
+    
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+        json.dump(custom_responses, f, ensure_ascii=False, indent=2)
+        temp_path = f.name
+    
+    try:
+        custom_config = ResponseConfig(temp_path)
+        defaults = custom_config._get_default_responses()
+        
+        # Keys present in the file override the defaults
+        assert custom_config.get_error_message("llm_down") == "L'assistant IA est actuellement indisponible."
+        print("✓ Custom message overrides the default")
+        
+        # Keys missing from the file use the built-in default, not the generic error
+        no_results = custom_config.get_error_message("no_search_results")
+        assert no_results == defaults["error_messages"]["no_search_results"], f"Unexpected message: {no_results}"
+        untitled = custom_config.get_discourse_message("untitled_topic")
+        assert untitled == defaults["discourse_messages"]["untitled_topic"], f"Unexpected message: {untitled}"
+        print("✓ Missing keys fall back to built-in defaults")
+        
+        # Keys unknown to both still get the generic error
+        assert custom_config.get_error_message("not_a_real_key") == "Sorry, an unexpected error occurred"
+        print("✓ Unknown keys fall back to the generic error")
+        
+    finally:
+        os.unlink(temp_path)
+    
+    print("🎉 Default fallback test passed!")
+    return True
+
+
+def test_reload():
+    """Test reloading responses, keeping the current ones when the new file is bad."""
+    print("\nTesting response reload...")
+    
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+        json.dump({"error_messages": {"llm_down": "Original message"}}, f)
+        temp_path = f.name
+    
+    def write_file(text):
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    
+    try:
+        config = ResponseConfig(temp_path)
+        assert config.get_error_message("llm_down") == "Original message"
+        
+        # A valid edit is picked up
+        write_file(json.dumps({"error_messages": {"llm_down": "Updated message"}}))
+        assert asyncio.run(config.reload_async()) is True, "Reload of a valid file should succeed"
+        assert config.get_error_message("llm_down") == "Updated message"
+        print("✓ Valid file reloaded")
+        
+        # Invalid JSON and valid JSON that is not an object are both rejected
+        for bad_content in ["{not json", "[]", '"just a string"']:
+            write_file(bad_content)
+            assert asyncio.run(config.reload_async()) is False, f"Reload should fail for {bad_content!r}"
+            assert config.get_error_message("llm_down") == "Updated message", \
+                f"Current responses should be kept after failing to reload {bad_content!r}"
+        print("✓ Invalid files rejected and current responses kept")
+        
+        # A missing file is rejected as well
+        os.unlink(temp_path)
+        assert asyncio.run(config.reload_async()) is False, "Reload of a missing file should fail"
+        assert config.get_error_message("llm_down") == "Updated message"
+        print("✓ Missing file rejected and current responses kept")
+        
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    
+    print("🎉 Reload test passed!")
+    return True
+
+
 if __name__ == "__main__":
     try:
         success1 = test_response_config()
-        success2 = test_integration()
+        success2 = test_missing_keys_use_defaults()
+        success3 = test_reload()
+        success4 = test_integration()
         
-        if success1 and success2:
+        if success1 and success2 and success3 and success4:
             print("\n🎉 All tests passed!")
             sys.exit(0)
         else:
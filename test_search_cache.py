@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test the Discourse search result cache.
+
+This test validates:
+1. Equivalent queries (case and whitespace) share a cache entry
+2. Entries expire after the configured TTL
+3. The least recently used entry is evicted when the cache is full
+4. Empty results are not cached
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+# Add src to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.discourse import DiscoursePost, DiscourseSearchCache
+
+
+def make_post(post_id):
+    """Build a minimal search result."""
+    return DiscoursePost(
+        id=post_id,
+        title=f"Topic {post_id}",
+        excerpt="Excerpt",
+        url=f"https://discourse.aosus.org/t/{post_id}",
+        topic_id=post_id,
+    )
+
+
+class FakeClock:
+    """Controllable replacement for time.monotonic."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+
+
+def test_key_normalization():
+    """Test that queries differing only in case and whitespace share an entry."""
+    print("=== Testing Query Normalization ===")
+    
+    cache = DiscourseSearchCache(ttl_seconds=60)
+    results = [make_post(1)]
+    cache.set("  How to Install   Ubuntu ", 5, results)
+    
+    cached = cache.get("how to install ubuntu", 5)
+    assert cached == results, f"Expected normalized hit, got {cached}"
+    print("✓ Case and whitespace are normalized")
+    
+    # The result limit is part of the key
+    assert cache.get("how to install ubuntu", 10) is None, "Different limits should not share an entry"
+    print("✓ Result limit is part of the key")
+    
+    # Callers get a copy, so mutating it does not change the cache
+    cached.append(make_post(2))
+    assert len(cache.get("how to install ubuntu", 5)) == 1, "Cached results should not be mutated"
+    print("✓ Cached results are returned as a copy")
+    
+    return True
+
+
+def test_expiry():
+    """Test that entries expire after the TTL."""
+    print("\n=== Testing Expiry ===")
+    
+    clock = FakeClock()
+    with patch("src.discourse.time", clock):
+        cache = DiscourseSearchCache(ttl_seconds=60)
+        cache.set("ubuntu", 5, [make_post(1)])
+        
+        clock.now += 59
+        assert cache.get("ubuntu", 5) is not None, "Entry should still be valid before the TTL"
+        print("✓ Entry served before the TTL")
+        
+        clock.now += 2
+        assert cache.get("ubuntu", 5) is None, "Entry should expire after the TTL"
+        assert len(cache._entries) == 0, "Expired entry should be removed"
+        print("✓ Entry expires and is removed after the TTL")
+    
+    return True
+
+
+def test_eviction():
+    """Test that the least recently used entry is evicted."""
+    print("\n=== Testing Eviction ===")
+    
+    cache = DiscourseSearchCache(ttl_seconds=60, max_entries=2)
+    cache.set("first", 5, [make_post(1)])
+    cache.set("second", 5, [make_post(2)])
+    
+    # Reading "first" makes "second" the least recently used entry
+    assert cache.get("first", 5) is not None
+    cache.set("third", 5, [make_post(3)])
+    
+    assert cache.get("second", 5) is None, "Least recently used entry should be evicted"
+    assert cache.get("first", 5) is not None, "Recently used entry should be kept"
+    assert cache.get("third", 5) is not None, "New entry should be stored"
+    print("✓ Least recently used entry evicted")
+    
+    return True
+
+
+def test_empty_results_not_cached():
+    """Test that empty results are searched again instead of being cached."""
+    print("\n=== Testing Empty Results ===")
+    
+    cache = DiscourseSearchCache(ttl_seconds=60)
+    cache.set("nothing here", 5, [])
+    assert cache.get("nothing here", 5) is None, "Empty results should not be cached"
+    print("✓ Empty results are not cached")
+    
+    return True
+
+
+def main():
+    """Run all search cache tests."""
+    print("Testing Discourse search cache...\n")
+    
+    try:
+        test_key_normalization()
+        test_expiry()
+        test_eviction()
+        test_empty_results_not_cached()
+        
+        print("\n🎉 All search cache tests passed!")
+        return True
+    
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        return False
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Test streamed answers (BOT_STREAM_RESPONSES=true).
+
+This test validates:
+1. Streamed completions are reassembled into text, tool calls, finish reason and usage
+2. Partial text is only forwarded until the model starts a tool call
+3. Edits are sent as Matrix m.replace events with m.new_content
+4. Partial answers are debounced and the final answer always replaces the partial text
+5. The final answer is sent as a new message when nothing could be streamed
+"""
+
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock, patch
+
+# Add src to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+TEST_ENV = {
+    "MATRIX_HOMESERVER_URL": "https://matrix.test.org",
+    "MATRIX_USER_ID": "@testbot:matrix.test.org",
+    "MATRIX_PASSWORD": "test_password",
+    "LLM_API_KEY": "test_key",
+    "BOT_STREAM_RESPONSES": "true",
+}
+
+
+def make_chunk(content=None, tool_calls=None, finish_reason=None):
+    """Build a streamed completion chunk with a single choice."""
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+
+def make_tool_call_delta(index, call_id=None, name=None, arguments=None):
+    """Build a partial tool call as it appears in a streamed delta."""
+    return SimpleNamespace(
+        index=index,
+        id=call_id,
+        function=SimpleNamespace(name=name, arguments=arguments),
+    )
+
+
+class FakeStream:
+    """Async iterator over prepared completion chunks."""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+async def test_stream_reassembly():
+    """Test that streamed deltas are rebuilt into a complete assistant message."""
+    print("=== Testing Streamed Completion Reassembly ===")
+    
+    from src.config import Config
+    from src.llm import LLMClient
+    
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+    chunks = [
+        make_chunk("Let me "),
+        make_chunk("search."),
+        # The tool call name and arguments arrive split across chunks
+        make_chunk(tool_calls=[make_tool_call_delta(0, "call_1", "search_", '{"que')]),
+        make_chunk(tool_calls=[make_tool_call_delta(0, None, "discourse", 'ry": "ubuntu"}')]),
+        make_chunk(" ignored", finish_reason="tool_calls"),
+        # With include_usage the last chunk carries usage and no choices
+        SimpleNamespace(usage=usage, choices=[]),
+    ]
+    
+    with patch.dict(os.environ, TEST_ENV):
+        config = Config()
+        client = LLMClient(config, MagicMock())
+    
+    client.client = MagicMock()
+    client.client.chat.completions.create = AsyncMock(return_value=FakeStream(chunks))
+    
+    partials = []
+    
+    async def on_partial(text):
+        partials.append(text)
+    
+    message, finish_reason, returned_usage = await client._stream_completion({"model": "test"}, on_partial, lambda: True)
+    
+    request_kwargs = client.client.chat.completions.create.call_args.kwargs
+    assert request_kwargs["stream"] is True, "Completion should be requested with stream=True"
+    assert request_kwargs["stream_options"] == {"include_usage": True}, "Usage should be requested for streams"
+    print("✓ Streamed request asks for usage")
+    
+    assert message.content == "Let me search. ignored", f"Unexpected content: {message.content!r}"
+    assert len(message.tool_calls) == 1, "Expected one reassembled tool call"
+    tool_call = message.tool_calls[0]
+    assert tool_call.id == "call_1"
+    assert tool_call.function.name == "search_discourse"
+    assert tool_call.function.arguments == '{"query": "ubuntu"}'
+    assert finish_reason == "tool_calls"
+    assert returned_usage is usage, "Usage from the final chunk should be returned"
+    print("✓ Text, tool call, finish reason and usage reassembled")
+    
+    # Text after the tool call started is not forwarded
+    assert partials == ["Let me ", "Let me search."], f"Unexpected partials: {partials}"
+    print("✓ Partial text stops once a tool call starts")
+    
+    # OpenAI-compatible servers may reject stream_options, so it is only sent to OpenAI
+    with patch.dict(os.environ, {**TEST_ENV, "LLM_BASE_URL": "https://openrouter.ai/api/v1"}):
+        client = LLMClient(Config(), MagicMock())
+    
+    client.client = MagicMock()
+    client.client.chat.completions.create = AsyncMock(return_value=FakeStream(chunks[:2]))
+    
+    message, _, returned_usage = await client._stream_completion({"model": "test"}, on_partial, lambda: True)
+    
+    request_kwargs = client.client.chat.completions.create.call_args.kwargs
+    assert request_kwargs["stream"] is True
+    assert "stream_options" not in request_kwargs, "stream_options should only be sent to the OpenAI API"
+    assert message.content == "Let me search."
+    assert returned_usage is None
+    print("✓ stream_options not sent to other OpenAI-compatible servers")
+    
+    return True
+
+
+def make_bot():
+    """Create a bot with a mocked Matrix client."""
+    from src.config import Config
+    from src.bot import AskaosusBot
+    
+    with patch.dict(os.environ, TEST_ENV):
+        config = Config()
+        bot = AskaosusBot(config)
+    
+    bot.matrix_client = MagicMock()
+    bot.matrix_client.room_send = AsyncMock(return_value=SimpleNamespace(event_id="$answer"))
+    return bot
+
+
+async def test_edit_answer_content():
+    """Test that edits use the Matrix m.replace format."""
+    print("\n=== Testing Edit Content ===")
+    
+    bot = make_bot()
+    room = SimpleNamespace(room_id="!test:matrix.org")
+    
+    await bot._edit_answer(room, "$answer", "Updated answer")
+    
+    content = bot.matrix_client.room_send.call_args.kwargs["content"]
+    assert content["m.relates_to"] == {"rel_type": "m.replace", "event_id": "$answer"}
+    assert content["m.new_content"]["body"] == "Updated answer"
+    assert content["m.new_content"]["msgtype"] == "m.text"
+    assert "formatted_body" in content["m.new_content"]
+    assert content["body"] == "* Updated answer", f"Unexpected fallback body: {content['body']!r}"
+    print("✓ Edit uses m.replace with m.new_content and a '* ' fallback body")
+    
+    return True
+
+
+async def test_streaming_debounce():
+    """Test that partial answers are debounced and the final answer replaces them."""
+    print("\n=== Testing Streaming Debounce ===")
+    
+    from src.config import Config
+    from src.llm import LLMClient
+    
+    chunks = [make_chunk("Hello"), make_chunk(" wor"), make_chunk("ld!", finish_reason="stop")]
+    
+    async def collect_partials(interval):
+        with patch.dict(os.environ, TEST_ENV):
+            client = LLMClient(Config(), MagicMock())
+        client.config.bot_stream_edit_interval = interval
+        client.client = MagicMock()
+        client.client.chat.completions.create = AsyncMock(return_value=FakeStream(chunks))
+        
+        partials = []
+        
+        async def on_partial(text):
+            partials.append(text)
+        
+        answer = await client.process_question_with_tools("question", on_partial=on_partial)
+        return answer, partials
+    
+    # A long interval: only the first partial is built and forwarded
+    answer, partials = await collect_partials(60)
+    assert answer == "Hello world!", f"Unexpected answer: {answer!r}"
+    assert partials == ["Hello"], f"Unexpected partials: {partials}"
+    print("✓ Partial answers within the interval are not built or forwarded")
+    
+    # No interval: every delta is forwarded with the text so far
+    answer, partials = await collect_partials(0)
+    assert partials == ["Hello", "Hello wor", "Hello world!"], f"Unexpected partials: {partials}"
+    print("✓ Every partial answer is forwarded without an interval")
+    
+    room = SimpleNamespace(room_id="!test:matrix.org")
+    
+    async def fake_process_question(question, on_partial=None):
+        for text in ["Hello", "Hello wor"]:
+            await on_partial(text)
+        return "Hello world!"
+    
+    # The first partial is sent, later ones are edits, and the final answer replaces them
+    bot = make_bot()
+    bot._process_question = fake_process_question
+    
+    await bot._process_question_streaming(room, "question", "$question")
+    
+    sends = [call.kwargs["content"] for call in bot.matrix_client.room_send.call_args_list]
+    assert len(sends) == 3, f"Expected initial send and two edits, got {len(sends)} events"
+    assert sends[0]["body"] == "Hello"
+    assert sends[0]["m.relates_to"] == {"m.in_reply_to": {"event_id": "$question"}}
+    assert sends[1]["m.new_content"]["body"] == "Hello wor"
+    assert sends[2]["m.new_content"]["body"] == "Hello world!"
+    assert "$answer" in bot.bot_message_ids, "Streamed answer should be tracked as a bot message"
+    print("✓ Final answer replaces the partial text")
+    
+    # An unchanged final answer is not re-sent
+    async def fake_process_question_unchanged(question, on_partial=None):
+        for text in ["Hello", "Hello world"]:
+            await on_partial(text)
+        return "Hello world"
+    
+    bot = make_bot()
+    bot._process_question = fake_process_question_unchanged
+    
+    await bot._process_question_streaming(room, "question", None)
+    
+    sends = [call.kwargs["content"] for call in bot.matrix_client.room_send.call_args_list]
+    assert len(sends) == 2, f"Expected one send and one edit, got {len(sends)} events"
+    assert "m.relates_to" not in sends[0], "Direct answers should not be sent as replies"
+    assert sends[1]["m.new_content"]["body"] == "Hello world"
+    print("✓ Unchanged final answer is not sent again")
+    
+    return True
+
+
+async def test_streaming_fallback():
+    """Test that the final answer is sent normally when nothing could be streamed."""
+    print("\n=== Testing Streaming Fallback ===")
+    
+    room = SimpleNamespace(room_id="!test:matrix.org")
+    
+    # No partial text at all (e.g. an error response)
+    bot = make_bot()
+    
+    async def fake_process_question_no_partials(question, on_partial=None):
+        return "Error message"
+    
+    bot._process_question = fake_process_question_no_partials
+    await bot._process_question_streaming(room, "question", None)
+    
+    sends = [call.kwargs["content"] for call in bot.matrix_client.room_send.call_args_list]
+    assert len(sends) == 1 and sends[0]["body"] == "Error message"
+    print("✓ Answer sent as a regular message when nothing was streamed")
+    
+    # The first send returns no event ID, so there is nothing to edit
+    bot = make_bot()
+    bot.matrix_client.room_send = AsyncMock(return_value=SimpleNamespace())
+    
+    async def fake_process_question(question, on_partial=None):
+        await on_partial("Partial")
+        await on_partial("Partial answer")
+        return "Partial answer, done"
+    
+    bot._process_question = fake_process_question
+    await bot._process_question_streaming(room, "question", None)
+    
+    sends = [call.kwargs["content"] for call in bot.matrix_client.room_send.call_args_list]
+    assert len(sends) == 2, f"Expected the partial and the final message, got {len(sends)} events"
+    assert "m.new_content" not in sends[1], "Final answer should not be an edit without an event ID"
+    assert sends[1]["body"] == "Partial answer, done"
+    print("✓ Streaming stops and the final answer is sent when the event ID is unknown")
+    
+    return True
+
+
+async def main():
+    """Run all streaming tests."""
+    print("Testing streamed answers...\n")
+    
+    try:
+        results = [
+            await test_stream_reassembly(),
+            await test_edit_answer_content(),
+            await test_streaming_debounce(),
+            await test_streaming_fallback(),
+        ]
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    
+    if all(results):
+        print("\n🎉 All streaming tests passed!")
+        return 0
+    
+    print("\n❌ Some streaming tests failed!")
+    return 1
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    sys.exit(exit_code)
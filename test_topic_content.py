@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Test the cleanup of Discourse topic content sent to the LLM.
+
+This test validates:
+1. <br> variants become newlines and other tags are dropped
+2. Text that only looks like a tag ("<>", unterminated "<") is kept
+3. The scanner matches the reference regular expressions on random input
+4. HTML entities are decoded, and text without "&" is left untouched
+5. Empty posts are skipped and the content is cut at the limit
+6. Topic fetches during a search are limited in concurrency, and rate-limited
+   topics fall back to their excerpt
+"""
+
+import os
+import re
+import sys
+import random
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add src to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.discourse import DiscoursePost, DiscourseRateLimitError, DiscourseSearcher, _strip_tags, _TOPIC_FETCH_CONCURRENCY
+
+TEST_ENV = {
+    "MATRIX_HOMESERVER_URL": "https://matrix.test.org",
+    "MATRIX_USER_ID": "@testbot:matrix.test.org",
+    "MATRIX_PASSWORD": "test_password",
+    "LLM_API_KEY": "test_key",
+}
+
+# The regular expressions the scanner replaced
+_REFERENCE_BR_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
+_REFERENCE_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def reference_strip_tags(text):
+    """Strip tags with the original two-pass regex implementation."""
+    return _REFERENCE_TAG_RE.sub('', _REFERENCE_BR_RE.sub('\n', text))
+
+
+def test_strip_tags_cases():
+    """Test tag stripping on hand-picked inputs."""
+    print("=== Testing Tag Stripping ===")
+    
+    test_cases = [
+        ("plain text", "plain text", "Plain text is returned unchanged"),
+        ("<p>Hello <b>world</b></p>", "Hello world", "Tags are dropped"),
+        ("a<br>b<br/>c<br />d<BR>e", "a\nb\nc\nd\ne", "<br> variants become newlines"),
+        ("a<br\n/>b", "a\nb", "Whitespace inside <br> is allowed"),
+        ("a<brx>b<br class=\"x\">c", "abc", "Other tags starting with br are dropped"),
+        ("1 <> 2", "1 <> 2", "<> is not a tag"),
+        ("1 < 2", "1 < 2", "Unterminated < is kept"),
+        ("a < b <i>c</i>", "a c", "A < is a tag start up to the next >"),
+        ("x > y", "x > y", "A lone > is kept"),
+        ("", "", "Empty input"),
+    ]
+    
+    for text, expected, description in test_cases:
+        result = _strip_tags(text)
+        assert result == expected, f"{description}: expected {expected!r}, got {result!r}"
+        print(f"✓ {description}")
+    
+    return True
+
+
+def test_strip_tags_matches_reference():
+    """Compare the scanner with the original regex implementation on random input."""
+    print("\n=== Testing Tag Stripping Against Reference ===")
+    
+    # Pieces of well-formed cooked HTML plus the odd characters around them
+    pieces = ['<br>', '<BR/>', '<br />', '<brx>', '<b>', '</p>', '<a href="x">',
+              'a', ' ', '/', '\t', '&amp;', '<p class="y">', '\n']
+    rng = random.Random(1234)
+    
+    for _ in range(20000):
+        text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+        expected = reference_strip_tags(text)
+        result = _strip_tags(text)
+        assert result == expected, f"Mismatch for {text!r}: expected {expected!r}, got {result!r}"
+    
+    print("✓ Scanner matches the reference on 20000 random inputs")
+    return True
+
+
+class FakeResponse:
+    """Minimal aiohttp response for a topic request."""
+    
+    def __init__(self, data, status=200):
+        self.status = status
+        self._data = data
+    
+    async def json(self):
+        return self._data
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *args):
+        return False
+
+
+def make_searcher(posts):
+    """Create a searcher whose session returns a topic with the given cooked posts."""
+    from src.config import Config
+    
+    with patch.dict(os.environ, TEST_ENV):
+        searcher = DiscourseSearcher(Config(), response_config=MagicMock())
+    
+    session = MagicMock()
+    session.get = MagicMock(return_value=FakeResponse({
+        "post_stream": {"posts": [{"cooked": cooked} for cooked in posts]}
+    }))
+    searcher._get_session = MagicMock(return_value=session)
+    return searcher
+
+
+async def test_topic_content():
+    """Test entity decoding, empty posts and the length limit."""
+    print("\n=== Testing Topic Content ===")
+    
+    searcher = make_searcher([
+        "<p>Use <code>apt</code> &amp; <code>dpkg</code></p>",
+        "   ",
+        None,
+        "<p>Second&nbsp;post<br>line</p>",
+    ])
+    content = await searcher._fetch_limited_topic_content(1)
+    assert content == "Use apt & dpkg\n\nSecond\xa0post\nline", f"Unexpected content: {content!r}"
+    print("✓ Entities decoded and empty posts skipped")
+    
+    # Without "&" the text is not passed through html.unescape at all
+    searcher = make_searcher(["<p>No entities here</p>"])
+    with patch("src.discourse.html.unescape") as unescape:
+        content = await searcher._fetch_limited_topic_content(1)
+    assert content == "No entities here"
+    assert not unescape.called, "html.unescape should be skipped when there is no '&'"
+    print("✓ Entity decoding skipped for text without '&'")
+    
+    # Processing stops once the limit is filled, with the same result as a full join
+    posts = [f"<p>{'x' * 10}</p>" for _ in range(10)]
+    searcher = make_searcher(posts)
+    with patch("src.discourse._strip_tags", side_effect=_strip_tags) as strip_tags:
+        content = await searcher._fetch_limited_topic_content(1, limit=25)
+    assert content == "\n\n".join(['x' * 10] * 10)[:25], f"Unexpected content: {content!r}"
+    assert strip_tags.call_count == 3, f"Expected 3 posts to be processed, got {strip_tags.call_count}"
+    print("✓ Content cut at the limit without processing later posts")
+    
+    return True
+
+
+async def test_search_topic_fetches():
+    """Test that topic fetches are bounded and rate limits keep the excerpt."""
+    print("\n=== Testing Topic Fetches During Search ===")
+    
+    searcher = make_searcher([])
+    results = [
+        DiscoursePost(id=i, title=f"Topic {i}", excerpt="Excerpt", url=f"https://discourse.aosus.org/t/{i}", topic_id=i)
+        for i in range(10)
+    ]
+    searcher._perform_search = AsyncMock(return_value=results)
+    
+    in_flight = 0
+    max_in_flight = 0
+    
+    async def fake_fetch(topic_id, limit=1000):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if topic_id == 3:
+            raise DiscourseRateLimitError("Rate limit exceeded")
+        if topic_id == 7:
+            raise RuntimeError("Failed to fetch topic")
+        return f"Content {topic_id}"
+    
+    searcher._fetch_limited_topic_content = fake_fetch
+    with patch("src.discourse.logger") as logger:
+        posts = await searcher.search("ubuntu", 10)
+    
+    assert max_in_flight == _TOPIC_FETCH_CONCURRENCY, f"Expected {_TOPIC_FETCH_CONCURRENCY} fetches at once, got {max_in_flight}"
+    print(f"✓ At most {_TOPIC_FETCH_CONCURRENCY} topic fetches in flight")
+    
+    assert posts[0].excerpt == "Content 0"
+    assert posts[3].excerpt == "Excerpt", "Rate-limited topic should keep its excerpt"
+    assert posts[7].excerpt == "Excerpt", "Failed topic should keep its excerpt"
+    print("✓ Failed topics fall back to their excerpt")
+    
+    warnings = [call.args[0] for call in logger.warning.call_args_list]
+    assert any("Rate limit" in message and "1 of 10" in message for message in warnings), f"Missing rate limit warning: {warnings}"
+    assert any("topic 7" in message for message in warnings), f"Missing failure warning: {warnings}"
+    assert not any("topic 3" in message for message in warnings), "Rate limits should be logged separately"
+    print("✓ Rate limits logged separately from other failures")
+    
+    # A 429 from Discourse is raised as a rate limit error
+    searcher = make_searcher([])
+    searcher._get_session().get = MagicMock(return_value=FakeResponse({}, status=429))
+    try:
+        await searcher._fetch_limited_topic_content(1)
+        assert False, "Expected DiscourseRateLimitError"
+    except DiscourseRateLimitError:
+        print("✓ HTTP 429 raised as DiscourseRateLimitError")
+    
+    return True
+
+
+async def main():
+    """Run all topic content tests."""
+    print("Testing Discourse topic content cleanup...\n")
+    
+    try:
+        test_strip_tags_cases()
+        test_strip_tags_matches_reference()
+        await test_topic_content()
+        await test_search_topic_fetches()
+        
+        print("\n🎉 All topic content tests passed!")
+        return 0
+    
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    sys.exit(exit_code)